@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.utils import timezone
+from .capacity import schedule_capacity_refresh
+from .dashboard_cache import invalidate_dashboards
+from .events import publish_appointment_event
+from .models import Appointment, AppointmentTransition
+from .watermarks import touch_user_watermarks
+
+# Appointment status state machine.
+# Every status change goes through transition() or bulk_transition(), which
+# apply it as UPDATE ... WHERE id = ? AND status = <expected>. If someone else
+# changed the appointment first the UPDATE matches nothing and the call reports
+# it instead of silently overwriting their change.
+
+TRANSITIONS = {
+    'pending': {'confirmed', 'rejected', 'cancelled', 'completed'},
+    'confirmed': {'pending_student_review', 'completed'},
+    'pending_student_review': {'completed', 'cancelled', 'disputed'},
+    'disputed': {'completed', 'cancelled'},
+    'completed': set(),
+    'rejected': set(),
+    'cancelled': set(),
+}
+
+# Fields needed to log, invalidate and publish a transition without a reload
+EVENT_FIELDS = ('id', 'status', 'topic', 'date', 'time', 'student', 'consultant')
+
+
+class IllegalTransition(ValueError):
+    pass
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def check_transition(from_status, to_status):
+    if not can_transition(from_status, to_status):
+        raise IllegalTransition(f"An appointment can't go from {from_status} to {to_status}.")
+
+
+def _record(appointments, previous_statuses, actor):
+    # update() sends no post_save, so do what the signal receivers would have
+    AppointmentTransition.objects.bulk_create([
+        AppointmentTransition(
+            appointment_id=appointment.id,
+            appointment_number=appointment.id,
+            from_status=previous_statuses[appointment.id],
+            to_status=appointment.status,
+            actor=actor,
+        )
+        for appointment in appointments
+    ])
+
+    user_ids = {appointment.student_id for appointment in appointments}
+    user_ids |= {appointment.consultant_id for appointment in appointments}
+    invalidate_dashboards(*user_ids)
+    touch_user_watermarks(*user_ids)
+
+    for appointment in appointments:
+        publish_appointment_event(appointment, previous_statuses[appointment.id])
+
+    # Only bookings entering or leaving an active status change free hours
+    schedule_capacity_refresh(*{
+        appointment.consultant_id for appointment in appointments
+        if (previous_statuses[appointment.id] in Appointment.ACTIVE_STATUSES) != (appointment.status in Appointment.ACTIVE_STATUSES)
+    })
+
+
+def create_appointments(appointments, actor=None):
+    # bulk_create() for new appointments, with the same logging, invalidation
+    # and events that save() would have triggered one by one
+    for appointment in appointments:
+        appointment.end_time = Appointment.compute_end_time(appointment.time, appointment.duration_minutes)
+
+    with transaction.atomic():
+        created = Appointment.objects.bulk_create(appointments)
+        _record(created, {appointment.id: None for appointment in created}, actor)
+
+    return created
+
+
+def transition(appointment, to_status, actor=None, **changes):
+    # Moves an already loaded appointment from its current status to
+    # to_status, writing only status, updated_at and the given fields.
+    # Returns False (and changes nothing) if the row's status in the database
+    # is no longer the one that was loaded.
+    from_status = appointment.status
+    check_transition(from_status, to_status)
+
+    changes['status'] = to_status
+    changes['updated_at'] = timezone.now()
+
+    with transaction.atomic():
+        updated = Appointment.objects.filter(id=appointment.id, status=from_status).update(**changes)
+        if not updated:
+            return False
+
+        for field, value in changes.items():
+            setattr(appointment, field, value)
+        appointment._loaded_status = to_status
+        _record([appointment], {appointment.id: from_status}, actor)
+
+    return True
+
+
+def bulk_transition(appointment_ids, from_statuses, to_status, actor=None, **changes):
+    # Moves every appointment in appointment_ids (a list or an id subquery)
+    # that is currently in one of from_statuses to to_status. Returns the
+    # appointments that actually changed, with only EVENT_FIELDS loaded;
+    # the rest were missing or already in another status.
+    if isinstance(from_statuses, str):
+        from_statuses = [from_statuses]
+    for from_status in from_statuses:
+        check_transition(from_status, to_status)
+
+    changes['status'] = to_status
+    changes['updated_at'] = timezone.now()
+
+    with transaction.atomic():
+        # Lock the rows so the statuses logged are the ones that were replaced
+        appointments = list(
+            Appointment.objects.select_for_update()
+            .filter(id__in=appointment_ids, status__in=from_statuses)
+            .only(*EVENT_FIELDS)
+        )
+        if not appointments:
+            return appointments
+
+        ids = [appointment.id for appointment in appointments]
+        Appointment.objects.filter(id__in=ids).update(**changes)
+
+        previous_statuses = {appointment.id: appointment.status for appointment in appointments}
+        for appointment in appointments:
+            for field, value in changes.items():
+                setattr(appointment, field, value)
+        _record(appointments, previous_statuses, actor)
+
+    return appointments
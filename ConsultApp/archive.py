@@ -0,0 +1,74 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import Appointment, AppointmentTransition, ArchivedAppointment, Feedback
+
+# Hot/cold appointment storage.
+# Finished appointments past APPOINTMENT_ARCHIVE_AFTER_DAYS are moved out of
+# the Appointment table (which every booking check and dashboard reads) into
+# ArchivedAppointment, keeping their ids. Their feedback is re-pointed at the
+# archived row and their transition log is copied onto it; the log rows
+# themselves stay in AppointmentTransition.
+
+ARCHIVE_STATUSES = ('completed', 'cancelled', 'rejected')
+
+# Columns copied as-is; ArchivedAppointment mirrors them
+ARCHIVED_COLUMNS = [
+    field.attname for field in ArchivedAppointment._meta.concrete_fields
+    if field.name not in ('transitions', 'archived_at')
+]
+
+TRANSITION_COLUMNS = ('appointment_number', 'id', 'from_status', 'to_status', 'actor_id', 'created_at')
+
+
+def archive_batch(cutoff, batch_size):
+    # Moves up to batch_size finished appointments dated before cutoff in one
+    # transaction. Returns how many were moved.
+    with transaction.atomic():
+        rows = list(
+            Appointment.objects.select_for_update(skip_locked=True)
+            .filter(status__in=ARCHIVE_STATUSES, date__lt=cutoff)
+            .order_by('id')
+            .values(*ARCHIVED_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row['id'] for row in rows]
+
+        transitions = defaultdict(list)
+        for entry in AppointmentTransition.objects.filter(appointment_number__in=ids).order_by('id').values(*TRANSITION_COLUMNS):
+            transitions[entry.pop('appointment_number')].append(entry)
+
+        ArchivedAppointment.objects.bulk_create([
+            ArchivedAppointment(**row, transitions=transitions[row['id']]) for row in rows
+        ])
+        Feedback.objects.filter(appointment_id__in=ids).update(
+            archived_appointment_id=F('appointment_id'), appointment=None
+        )
+        # Goes through the post_delete receivers, which invalidate dashboards.
+        # The transition rows stay, with their foreign key cleared.
+        Appointment.objects.filter(id__in=ids).delete()
+
+    return len(ids)
+
+
+def archive_appointments(older_than_days=None, batch_size=None):
+    # Archives in batches until nothing is left to move; returns the total
+    if older_than_days is None:
+        older_than_days = settings.APPOINTMENT_ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.APPOINTMENT_ARCHIVE_BATCH_SIZE
+    cutoff = timezone.localdate() - timedelta(days=older_than_days)
+
+    total = 0
+    while moved := archive_batch(cutoff, batch_size):
+        total += moved
+    return total
+
+
+def archived_status_counts(**filters):
+    # (status, count) pairs of the matching archived appointments; the
+    # dashboards add these to their hot-table counts
+    return ArchivedAppointment.objects.filter(**filters).order_by().values_list('status').annotate(total=Count('id'))
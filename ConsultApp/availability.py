@@ -0,0 +1,129 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from django.db.models import Q
+from django.utils import timezone
+from .models import Appointment, Market
+
+# Earliest free slots across many consultants.
+# Two queries in total: the matching listings, and every active appointment of
+# those consultants in the date window. Each consultant's booked intervals are
+# merged and swept per day to yield free hourly slots in time order, and the
+# per-consultant streams are merged by start time.
+
+MAX_WINDOW_DAYS = 14
+SLOTS_PER_CONSULTANT = 3
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def merge_intervals(intervals):
+    # intervals: (start, end) minute pairs sorted by start
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_slots(listing, days, busy, duration, earliest):
+    # Yields (date, start_minute) in order. Slots start on the hour grid from
+    # available_from, the same grid book_appointment offers.
+    open_from, open_to = _minutes(listing["available_from"]), _minutes(listing["available_to"])
+    available_days = {day.strip().lower() for day in listing["available_days"].split(",") if day.strip()}
+
+    for day in days:
+        if day.strftime("%A").lower() not in available_days:
+            continue
+        start = open_from
+        if day == earliest.date():
+            # Same-day slots must still be in the future
+            now = _minutes(earliest.time()) + 1
+            if now > start:
+                start += -(-(now - start) // 60) * 60
+
+        for busy_start, busy_end in busy.get(day, []) + [[open_to, open_to]]:
+            while start + duration <= min(busy_start, open_to):
+                yield day, start
+                start += 60
+            if busy_end > start:
+                start += -(-(busy_end - start) // 60) * 60
+
+
+def window_days(date_from, date_to):
+    return [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+
+def busy_intervals(consultant_ids, date_from, date_to):
+    # {consultant_id: {date: merged busy intervals}} from one query over the
+    # consultants' active appointments in the window
+    busy = defaultdict(lambda: defaultdict(list))
+    booked = Appointment.objects.filter(
+        consultant_id__in=consultant_ids,
+        date__gte=date_from,
+        date__lte=date_to,
+        status__in=Appointment.ACTIVE_STATUSES,
+    ).order_by("consultant_id", "date", "time").values_list("consultant_id", "date", "time", "end_time")
+    for consultant_id, day, start, end in booked:
+        busy[consultant_id][day].append((_minutes(start), _minutes(end)))
+
+    return {
+        consultant_id: {day: merge_intervals(intervals) for day, intervals in days.items()}
+        for consultant_id, days in busy.items()
+    }
+
+
+def _tagged(slots, consultant_id):
+    for day, start in slots:
+        yield day, start, consultant_id
+
+
+def find_common_slots(expertise, date_from, date_to, duration_minutes, limit=20):
+    listings_qs = Market.objects.filter(
+        is_active=True,
+        consultant__is_verified=True,
+        available_to__isnull=False,
+    )
+    if expertise:
+        listings_qs = listings_qs.filter(
+            Q(consultant__expertise__icontains=expertise) | Q(profession__icontains=expertise)
+        )
+
+    # book_appointment uses a consultant's most recently updated listing
+    listings = {}
+    for listing in listings_qs.order_by("consultant_id", "-updated_at").values(
+        "id", "consultant_id", "consultant__user__first_name", "consultant__user__last_name",
+        "profession", "available_from", "available_to", "available_days",
+    ):
+        listings.setdefault(listing["consultant_id"], listing)
+    if not listings:
+        return []
+
+    busy = busy_intervals(listings, date_from, date_to)
+    days = window_days(date_from, date_to)
+    earliest = timezone.localtime()
+
+    streams = []
+    for consultant_id, listing in listings.items():
+        slots = free_slots(listing, days, busy.get(consultant_id, {}), duration_minutes, earliest)
+        streams.append(_tagged(islice(slots, SLOTS_PER_CONSULTANT), consultant_id))
+
+    results = []
+    for day, start, consultant_id in islice(heapq.merge(*streams), limit):
+        listing = listings[consultant_id]
+        start_at = datetime.combine(day, datetime.min.time()) + timedelta(minutes=start)
+        results.append({
+            "consultant_id": consultant_id,
+            "consultant_name": f"{listing['consultant__user__first_name']} {listing['consultant__user__last_name']}".strip(),
+            "market_id": listing["id"],
+            "profession": listing["profession"],
+            "date": day,
+            "start_time": start_at.time(),
+            "end_time": (start_at + timedelta(minutes=duration_minutes)).time(),
+        })
+    return results
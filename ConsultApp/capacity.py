@@ -0,0 +1,132 @@
+from datetime import timedelta, time as dt_time
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+from .availability import busy_intervals, free_slots, window_days
+from .models import Market, MarketCapacity
+from .watermarks import touch_watermarks
+
+# Marketplace capacity index.
+# One MarketCapacity row per active listing with its free hours over the next
+# CAPACITY_WINDOW_DAYS days and its next free slot, so cards can be sorted and
+# badged without per-card queries. Rows are recomputed per consultant after
+# their appointments or listings change, and for every listing by the
+# refresh_market_capacity command, which should run hourly so the window and
+# next free slots keep up with the clock. Rows that fall behind anyway are
+# ignored by pages and trigger a throttled refresh_stale_capacity().
+
+CAPACITY_WINDOW_DAYS = 14
+LOW_CAPACITY_HOURS = 5
+
+# A page view that finds stale rows refreshes every listing, at most once per
+# this many seconds across workers
+LAZY_REFRESH_INTERVAL = 600
+LAZY_REFRESH_KEY = "capacity:lazy_refresh"
+
+
+def refresh_capacity(consultant_ids=None):
+    # Recomputes the rows of the given consultants' listings (every listing
+    # when None) with three reads and one upsert. Returns {market_id: row}.
+    now = timezone.localtime()
+    days = window_days(now.date(), now.date() + timedelta(days=CAPACITY_WINDOW_DAYS - 1))
+
+    listings = Market.objects.filter(is_active=True)
+    existing = MarketCapacity.objects.all()
+    if consultant_ids is not None:
+        consultant_ids = {consultant_id for consultant_id in consultant_ids if consultant_id}
+        listings = listings.filter(consultant_id__in=consultant_ids)
+        existing = existing.filter(market__consultant_id__in=consultant_ids)
+    listings = list(listings.values("id", "consultant_id", "available_from", "available_to", "available_days"))
+    previous = {
+        market_id: displayed
+        for market_id, *displayed in existing.values_list("market_id", "free_hours", "next_free_date", "next_free_time")
+    }
+
+    busy = busy_intervals({listing["consultant_id"] for listing in listings}, days[0], days[-1])
+
+    rows = []
+    for listing in listings:
+        capacity = MarketCapacity(market_id=listing["id"], window_start=days[0])
+        rows.append(capacity)
+        if listing["available_to"] is None:
+            continue
+        for day, start in free_slots(listing, days, busy.get(listing["consultant_id"], {}), 60, now):
+            if capacity.next_free_date is None:
+                capacity.next_free_date = day
+                capacity.next_free_time = dt_time(*divmod(start, 60))
+            capacity.free_hours += 1
+
+    with transaction.atomic():
+        # Inactive and deleted listings have no capacity
+        existing.exclude(market_id__in=[row.market_id for row in rows]).delete()
+        MarketCapacity.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["market"],
+            update_fields=["window_start", "free_hours", "next_free_date", "next_free_time", "computed_at"],
+        )
+
+    # Student dashboards show capacity badges; their ETags only need to
+    # change when a badge does
+    current = {row.market_id: [row.free_hours, row.next_free_date, row.next_free_time] for row in rows}
+    if current != previous:
+        touch_watermarks("market")
+    return {row.market_id: row for row in rows}
+
+
+def schedule_capacity_refresh(*consultant_ids):
+    # Recompute once the booking or listing change is committed, so the read
+    # sees it and a rolled-back change leaves the index alone
+    consultant_ids = {consultant_id for consultant_id in consultant_ids if consultant_id}
+    if consultant_ids:
+        transaction.on_commit(lambda: refresh_capacity(consultant_ids))
+
+
+def is_stale(capacity, now):
+    if capacity is None or capacity.window_start != now.date():
+        return True
+    # The next free slot has started, so it (and the hours before it) are gone
+    return capacity.next_free_date == now.date() and capacity.next_free_time <= now.time()
+
+
+def capacity_ordering():
+    # Soonest available first. Missing and stale rows (the is_stale() rule)
+    # sort last, so a slot that has already passed can't put a listing on top.
+    now = timezone.localtime()
+    current = Q(capacity__window_start=now.date()) & ~Q(
+        capacity__next_free_date=now.date(), capacity__next_free_time__lte=now.time()
+    )
+
+    def fresh(field):
+        return Case(When(current, then=F(f"capacity__{field}")), default=None)
+
+    return (
+        fresh("next_free_date").asc(nulls_last=True),
+        fresh("next_free_time").asc(nulls_last=True),
+        fresh("free_hours").desc(nulls_last=True),
+        "id",
+    )
+
+
+def with_capacity(listings):
+    # Sets listing.availability on listings loaded with
+    # select_related("capacity"): their MarketCapacity, or None when it is
+    # missing or has fallen behind the clock (no badge is better than a slot
+    # that has already passed)
+    now = timezone.localtime()
+    for listing in listings:
+        capacity = getattr(listing, "capacity", None)
+        listing.availability = None if is_stale(capacity, now) else capacity
+    return listings
+
+
+def has_stale_capacity(listings):
+    # For listings passed through with_capacity()
+    return any(listing.availability is None for listing in listings)
+
+
+def refresh_stale_capacity():
+    # Backstop for the hourly job, called by pages that found stale rows
+    if cache.add(LAZY_REFRESH_KEY, True, LAZY_REFRESH_INTERVAL):
+        refresh_capacity()
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Backends whose entries only the current process can see
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Shared backends whose incr() is atomic
+ATOMIC_SHARED_CACHES = (
+    "ConsultApp.cache_backends.DatabaseCache",
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+)
+
+
+def per_process_cache():
+    return settings.CACHES["default"]["BACKEND"] in PER_PROCESS_CACHES
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    # Dashboard generations and page watermarks are invalidated through the
+    # default cache, so every worker has to read the same one
+    if settings.DEBUG or not per_process_cache():
+        return []
+    return [
+        Warning(
+            "The default cache is per process, so invalidations made by one "
+            "worker are not seen by the others.",
+            hint="Set DJANGO_CACHE_BACKEND=redis (or db).",
+            id="ConsultApp.W001",
+        )
+    ]
+
+
+@register()
+def check_rate_limit_cache(app_configs, **kwargs):
+    # Rate-limit counters must be shared by every worker and incremented
+    # atomically, or each worker (or each racing request) gets its own quota.
+    # A warning rather than an error: the test runner turns DEBUG off and
+    # runs on the per-process default cache
+    if settings.DEBUG or not settings.RATE_LIMIT_ENABLED:
+        return []
+    if settings.CACHES["default"]["BACKEND"] in ATOMIC_SHARED_CACHES:
+        return []
+    return [
+        Warning(
+            "Rate limiting needs a shared cache with atomic increments.",
+            hint="Set DJANGO_CACHE_BACKEND to db or redis, or RATE_LIMIT_ENABLED=False.",
+            id="ConsultApp.W002",
+        )
+    ]
@@ -0,0 +1,5 @@
+from django.conf import settings
+
+
+def appointment_events(request):
+    return {"appointment_events_enabled": settings.APPOINTMENT_EVENTS_ENABLED}
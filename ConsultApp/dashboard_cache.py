@@ -0,0 +1,104 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Per-user dashboard cache.
+# Each user has a generation; cached dashboard data is stored under a key that
+# includes it, so invalidating a user is a single write and a build that races
+# with an invalidation can never be served afterwards. Generations are
+# timestamps rather than counters, so one that was evicted comes back as a new
+# value instead of reusing a key that may still hold old data.
+
+DASHBOARD_ROLES = ("student", "consultant")
+
+# Hit/miss counts of this process only; a shared counter would be one more
+# cache write, on one hot key, per page view
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _generation_key(user_id):
+    return f"dashboard:gen:{user_id}"
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def new_generations(*keys):
+    now = time.time_ns()
+    cache.set_many({key: now for key in keys}, timeout=None)
+
+
+def dashboard_cache_key(role, user_id):
+    return f"dashboard:{role}:{user_id}:{get_generation(_generation_key(user_id))}"
+
+
+def get_dashboard_data(role, user_id, build):
+    key = dashboard_cache_key(role, user_id)
+    data = cache.get(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    data = build()
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_dashboards(*user_ids):
+    new_generations(*{_generation_key(uid) for uid in user_ids if uid})
+
+
+def dashboard_cache_stats():
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_dashboard_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+# Async counterparts for the ASGI dashboard views
+
+async def aget_generation(key):
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+async def adashboard_cache_key(role, user_id):
+    return f"dashboard:{role}:{user_id}:{await aget_generation(_generation_key(user_id))}"
+
+
+async def aget_dashboard_data(role, user_id, build):
+    key = await adashboard_cache_key(role, user_id)
+    data = await cache.aget(key)
+    if data is not None:
+        _count("hits")
+        return data
+
+    _count("misses")
+    data = await build()
+    await cache.aset(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
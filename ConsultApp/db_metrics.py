@@ -0,0 +1,33 @@
+from django.db import connections
+
+# Connection pool metrics for the current worker process.
+# Returns None when the database is not running in pooled mode (DATABASE_POOL).
+
+def database_pool_stats(alias="default"):
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+
+    # psycopg_pool only reports counters that are non-zero
+    stats = pool.get_stats()
+    requests_num = stats.get("requests_num", 0)
+    requests_queued = stats.get("requests_queued", 0)
+    requests_wait_ms = stats.get("requests_wait_ms", 0)
+
+    return {
+        "pool_min": stats.get("pool_min", 0),
+        "pool_max": stats.get("pool_max", 0),
+        "pool_size": stats.get("pool_size", 0),
+        "pool_available": stats.get("pool_available", 0),
+        "requests_waiting": stats.get("requests_waiting", 0),
+        "requests_num": requests_num,
+        "requests_queued": requests_queued,
+        "requests_errors": stats.get("requests_errors", 0),
+        "requests_wait_ms": requests_wait_ms,
+        "avg_wait_ms": round(requests_wait_ms / requests_num, 3) if requests_num else 0.0,
+        "avg_queued_wait_ms": round(requests_wait_ms / requests_queued, 3) if requests_queued else 0.0,
+        "connections_num": stats.get("connections_num", 0),
+        "connections_errors": stats.get("connections_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "returns_bad": stats.get("returns_bad", 0),
+    }
@@ -0,0 +1,119 @@
+import asyncio
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+# Read-replica routing.
+# Views opt in with @replica_reads; everything else, and every write, uses
+# the primary ("default"). Once a request writes, the rest of it reads from
+# the primary, and ReplicaPinMiddleware keeps that browser on the primary for
+# DATABASE_REPLICA_STICKY_SECONDS so users see their own changes despite
+# replication lag.
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_primary"
+
+# DatabaseCache's table model
+CACHE_APP_LABEL = "django_cache"
+
+# Per-request routing state: {"replica": bool, "wrote": bool}
+_routing = ContextVar("db_routing", default=None)
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in connections.databases
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            # Cache generations and watermarks must never lag behind
+            return None
+        state = _routing.get()
+        if state and state["replica"] and not state["wrote"]:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state:
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA_ALIAS
+
+
+class ReplicaPinMiddleware:
+    # Tracks writes per request and sets the pin cookie after one.
+    # Must come before any middleware whose queries should be tracked.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = {"replica": False, "wrote": False}
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        # ORM calls run through sync_to_async copy this context, so they
+        # share (and update) the same state dict
+        state = {"replica": False, "wrote": False}
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state["wrote"] and replica_enabled():
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def _use_replica(request):
+    state = _routing.get()
+    if state is not None and replica_enabled() and PIN_COOKIE not in request.COOKIES:
+        state["replica"] = True
+
+
+def replica_reads(view_func):
+    # Lets a read-only view's queries go to the replica
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_view(request, *args, **kwargs):
+            _use_replica(request)
+            return await view_func(request, *args, **kwargs)
+        return _async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        _use_replica(request)
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
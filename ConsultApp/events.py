@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Appointment status events for the SSE stream.
+# Subscribers are asyncio queues living in this process. On PostgreSQL every
+# event goes out through NOTIFY and comes back through one LISTEN thread per
+# process, so a change made by any worker reaches every subscriber. Other
+# databases deliver in-process only.
+
+CHANNEL = "appointment_events"
+
+_subscribers = {}
+_lock = threading.Lock()
+_listener = None
+
+
+def notify_enabled():
+    return settings.APPOINTMENT_EVENTS_NOTIFY and connection.vendor == 'postgresql'
+
+
+def subscribe(user_id):
+    queue = asyncio.Queue(maxsize=100)
+    with _lock:
+        _subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+    if notify_enabled():
+        _start_listener()
+    return queue
+
+
+def unsubscribe(user_id, queue):
+    with _lock:
+        subscribers = _subscribers.get(user_id, set())
+        subscribers.difference_update({item for item in subscribers if item[1] is queue})
+        if not subscribers:
+            _subscribers.pop(user_id, None)
+
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # A stalled client only loses events; it reloads on reconnect anyway
+        pass
+
+
+def deliver(event):
+    with _lock:
+        targets = [
+            item for user_id in event["user_ids"] for item in _subscribers.get(user_id, ())
+        ]
+    for loop, queue in targets:
+        loop.call_soon_threadsafe(_put, queue, event)
+
+
+def build_appointment_event(appointment, previous_status):
+    return {
+        "appointment_id": appointment.id,
+        "status": appointment.status,
+        "previous_status": previous_status,
+        "topic": appointment.topic,
+        "date": appointment.date.isoformat() if appointment.date else None,
+        "time": appointment.time.strftime("%H:%M") if appointment.time else None,
+        "user_ids": [appointment.student_id, appointment.consultant_id],
+    }
+
+
+def publish(event):
+    # Runs after the surrounding transaction commits so listeners never see
+    # a status that could still roll back.
+    def send():
+        if notify_enabled():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(event)])
+        else:
+            deliver(event)
+
+    transaction.on_commit(send)
+
+
+def publish_appointment_event(appointment, previous_status):
+    publish(build_appointment_event(appointment, previous_status))
+
+
+def _start_listener():
+    global _listener
+    with _lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        _listener = threading.Thread(target=_listen_forever, name="appointment-events", daemon=True)
+        _listener.start()
+
+
+def _listen_forever():
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    wrapper = connections['default']
+    while True:
+        conn = None
+        try:
+            conn = wrapper.Database.connect(**wrapper.get_connection_params())
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+
+            if is_psycopg3:
+                for notify in conn.notifies():
+                    deliver(json.loads(notify.payload))
+            else:
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        deliver(json.loads(conn.notifies.pop(0).payload))
+        except Exception:
+            logger.exception("Appointment event listener failed; reconnecting")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
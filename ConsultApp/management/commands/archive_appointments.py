@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ConsultApp.archive import archive_appointments
+
+
+class Command(BaseCommand):
+    help = "Move finished appointments older than APPOINTMENT_ARCHIVE_AFTER_DAYS into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.APPOINTMENT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=settings.APPOINTMENT_ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        moved = archive_appointments(options["days"], options["batch_size"])
+        self.stdout.write(f"Archived {moved} appointments finished more than {options['days']} days ago.")
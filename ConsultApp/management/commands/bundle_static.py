@@ -0,0 +1,44 @@
+import gzip
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ConsultApp.static_bundles import build_bundle, bundle_path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Command(BaseCommand):
+    help = "Concatenate and minify the per-page stylesheet bundles (run before collectstatic)."
+
+    def handle(self, *args, **options):
+        totals = {"requests_before": 0, "requests_after": 0, "bytes_before": 0, "bytes_after": 0}
+
+        self.stdout.write(f"{'bundle':<22}{'files':>6}{'source':>10}{'minified':>10}{'gzip':>8}{'brotli':>8}")
+        for name in settings.STATIC_BUNDLES:
+            sources, css = build_bundle(name)
+
+            output = settings.STATIC_BUNDLE_ROOT / bundle_path(name)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_text(css, encoding='utf-8')
+
+            data = css.encode('utf-8')
+            source_size = sum(len(s.encode('utf-8')) for s in sources)
+            gzip_size = len(gzip.compress(data, 9))
+            brotli_size = len(brotli.compress(data)) if brotli else 0
+
+            totals["requests_before"] += len(sources)
+            totals["requests_after"] += 1
+            totals["bytes_before"] += source_size
+            totals["bytes_after"] += brotli_size or gzip_size
+
+            self.stdout.write(
+                f"{name:<22}{len(sources):>6}{source_size:>10}{len(data):>10}{gzip_size:>8}{brotli_size or '-':>8}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(settings.STATIC_BUNDLES)} bundles written to {settings.STATIC_BUNDLE_ROOT}: "
+            f"{totals['requests_before']} -> {totals['requests_after']} stylesheet requests, "
+            f"{totals['bytes_before']} -> {totals['bytes_after']} bytes on the wire"
+        ))
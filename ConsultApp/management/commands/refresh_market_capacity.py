@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ConsultApp.capacity import refresh_capacity, CAPACITY_WINDOW_DAYS
+
+
+class Command(BaseCommand):
+    help = "Recompute every listing's free hours and next free slot (run hourly, on the hour)."
+
+    def handle(self, *args, **options):
+        rows = refresh_capacity()
+        fully_booked = sum(1 for row in rows.values() if not row.free_hours)
+        self.stdout.write(
+            f"Refreshed {len(rows)} listings over the next {CAPACITY_WINDOW_DAYS} days; {fully_booked} fully booked."
+        )
@@ -0,0 +1,117 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from .dashboard_cache import aget_generation, get_generation, new_generations
+
+User = get_user_model()
+
+# Reverse one-to-one accessors from User to each role profile
+ROLE_PROFILE_RELATIONS = {
+    'student': 'student',
+    'consultant': 'consultant',
+    'admin': 'admin',
+}
+
+# Cached for users whose role has no profile row yet
+NO_PROFILE = "none"
+
+
+def _profile_generation_key(user_id):
+    return f"profile:gen:{user_id}"
+
+
+def _profile_key(user_id):
+    return f"profile:{user_id}"
+
+
+def _cached_profile(found, user_id):
+    # found: get_many() of both keys. The profile entry is (generation,
+    # profile) and only counts while that generation is still current.
+    generation = found.get(_profile_generation_key(user_id))
+    entry = found.get(_profile_key(user_id))
+    if generation is not None and entry is not None and entry[0] == generation:
+        return generation, entry[1]
+    return generation, None
+
+
+def invalidate_profile(*user_ids):
+    new_generations(*{_profile_generation_key(uid) for uid in user_ids if uid})
+
+
+def _role_relation(user):
+    relation = ROLE_PROFILE_RELATIONS.get(getattr(user, 'role', None))
+    return User._meta.get_field(relation) if relation else None
+
+
+def _attach(user, relation, profile):
+    # Caches both sides so user.student and profile.user need no query
+    if profile == NO_PROFILE:
+        profile = None
+    relation.set_cached_value(user, profile)
+    if profile is not None:
+        relation.field.set_cached_value(profile, user)
+    return profile
+
+
+def load_role_profile(user):
+    # The user's Student/Consultant/Admin row, from a short-lived cache entry
+    # read together with its generation in one round trip. Only the profile
+    # is cached: the user, their password hash and is_active are loaded and
+    # checked by django.contrib.auth on every request.
+    relation = _role_relation(user)
+    if relation is None:
+        return None
+
+    keys = [_profile_generation_key(user.pk), _profile_key(user.pk)]
+    generation, profile = _cached_profile(cache.get_many(keys), user.pk)
+    if profile is None:
+        if generation is None:
+            generation = get_generation(keys[0])
+        profile = relation.related_model.objects.filter(user_id=user.pk).first() or NO_PROFILE
+        cache.set(keys[1], (generation, profile), settings.PROFILE_CACHE_TIMEOUT)
+    return _attach(user, relation, profile)
+
+
+async def aload_role_profile(user):
+    relation = _role_relation(user)
+    if relation is None:
+        return None
+
+    keys = [_profile_generation_key(user.pk), _profile_key(user.pk)]
+    generation, profile = _cached_profile(await cache.aget_many(keys), user.pk)
+    if profile is None:
+        if generation is None:
+            generation = await aget_generation(keys[0])
+        profile = await relation.related_model.objects.filter(user_id=user.pk).afirst() or NO_PROFILE
+        await cache.aset(keys[1], (generation, profile), settings.PROFILE_CACHE_TIMEOUT)
+    return _attach(user, relation, profile)
+
+
+class RoleProfileMiddleware:
+    # Exposes the logged-in user's Student/Consultant/Admin row as
+    # request.profile (and user.<role>) without a query on most requests.
+    # Must come after AuthenticationMiddleware.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request.profile = None
+        if request.user.is_authenticated:
+            request.profile = load_role_profile(request.user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.profile = None
+        user = await request.auser()
+        if user.is_authenticated:
+            request.profile = await aload_role_profile(user)
+        return await self.get_response(request)
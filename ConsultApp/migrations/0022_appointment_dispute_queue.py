@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+def backfill_disputed_at(apps, schema_editor):
+    # The dispute queue pages on disputed_at, so every open dispute needs one
+    Appointment = apps.get_model('ConsultApp', 'Appointment')
+    Appointment.objects.filter(status='disputed', disputed_at__isnull=True).update(
+        disputed_at=models.F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0021_appointment_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_disputed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'disputed')), fields=['disputed_at', 'id'], name='appointment_dispute_queue'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:56
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0022_appointment_dispute_queue'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='user_email_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('first_name'), django.db.models.functions.text.Upper('last_name'), name='user_full_name_upper'),
+        ),
+    ]
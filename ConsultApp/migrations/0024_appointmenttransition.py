@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0023_user_case_insensitive_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled'), ('pending_student_review', 'Pending Student Review'), ('disputed', 'Disputed')], max_length=30, null=True)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled'), ('pending_student_review', 'Pending Student Review'), ('disputed', 'Disputed')], max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, help_text='Empty for automatic changes', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='ConsultApp.appointment')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
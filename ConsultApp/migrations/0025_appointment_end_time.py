@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, date as dt_date, time as dt_time
+
+from django.db import migrations, models
+
+
+def backfill_end_time(apps, schema_editor):
+    Appointment = apps.get_model('ConsultApp', 'Appointment')
+    appointments = list(Appointment.objects.only('id', 'time', 'duration_minutes'))
+    for appointment in appointments:
+        end = datetime.combine(dt_date.min, appointment.time) + timedelta(minutes=appointment.duration_minutes or 60)
+        appointment.end_time = end.time() if end.date() == dt_date.min else dt_time.max
+    Appointment.objects.bulk_update(appointments, ['end_time'], batch_size=500)
+
+
+# PostgreSQL only: no two active (pending/confirmed) appointments of the same
+# consultant, or of the same student, may overlap in time.
+# Any overlapping active bookings must be resolved before this migration runs.
+EXCLUSION_CONSTRAINTS = {
+    'appointment_consultant_no_overlap': 'consultant_id',
+    'appointment_student_no_overlap': 'student_id',
+}
+
+
+def add_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for name, column in EXCLUSION_CONSTRAINTS.items():
+        schema_editor.execute(
+            f'ALTER TABLE "ConsultApp_appointment" ADD CONSTRAINT {name} '
+            f'EXCLUDE USING gist ({column} WITH =, tsrange("date" + "time", "date" + "end_time") WITH &&) '
+            f"WHERE (status IN ('pending', 'confirmed'))"
+        )
+
+
+def remove_exclusion_constraints(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in EXCLUSION_CONSTRAINTS:
+        schema_editor.execute(f'ALTER TABLE "ConsultApp_appointment" DROP CONSTRAINT IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0024_appointmenttransition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_end_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_time',
+            field=models.TimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=['consultant', 'date', 'time'], name='appointment_consultant_active'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed'])), fields=['student', 'date', 'time'], name='appointment_student_active'),
+        ),
+        migrations.RunPython(add_exclusion_constraints, remove_exclusion_constraints),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0025_appointment_end_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketCapacity',
+            fields=[
+                ('market', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='capacity', serialize=False, to='ConsultApp.market')),
+                ('window_start', models.DateField()),
+                ('free_hours', models.PositiveIntegerField(default=0)),
+                ('next_free_date', models.DateField(blank=True, null=True)),
+                ('next_free_time', models.TimeField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:11
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0026_marketcapacity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feedback',
+            name='appointment',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feedback', to='ConsultApp.appointment'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('duration_minutes', models.IntegerField(default=60)),
+                ('end_time', models.TimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('rejected', 'Rejected'), ('cancelled', 'Cancelled'), ('pending_student_review', 'Pending Student Review'), ('disputed', 'Disputed')], max_length=30)),
+                ('research_title', models.CharField(blank=True, max_length=200)),
+                ('consultant_marked_as', models.CharField(blank=True, choices=[('completed', 'Completed'), ('not_completed', 'Not Completed')], max_length=20, null=True)),
+                ('student_dispute_remark', models.TextField(blank=True, null=True)),
+                ('disputed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('transitions', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('consultant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_consultant_appointments', to='ConsultApp.consultant')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_student_appointments', to='ConsultApp.student')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='archived_appointment',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feedback', to='ConsultApp.archivedappointment'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['student', '-date', '-time', '-id'], name='archived_student_history'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['consultant', '-date', '-time', '-id'], name='archived_consultant_history'),
+        ),
+    ]
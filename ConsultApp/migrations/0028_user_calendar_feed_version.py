@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0027_archivedappointment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_feed_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
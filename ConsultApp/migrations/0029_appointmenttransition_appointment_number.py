@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_appointment_number(apps, schema_editor):
+    AppointmentTransition = apps.get_model('ConsultApp', 'AppointmentTransition')
+    AppointmentTransition.objects.update(appointment_number=models.F('appointment_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ConsultApp', '0028_user_calendar_feed_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmenttransition',
+            name='appointment_number',
+            field=models.BigIntegerField(db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_appointment_number, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointmenttransition',
+            name='appointment_number',
+            field=models.BigIntegerField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='appointmenttransition',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transitions', to='ConsultApp.appointment'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from datetime import datetime, timedelta, date as dt_date, time as dt_time
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Upper
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from .storage_backends import VerificationStorage
 
@@ -60,12 +63,23 @@ class User(AbstractUser):
         ('admin', 'Admin'),
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    # Part of the signed calendar feed URL; bumping it revokes old links
+    calendar_feed_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'   
     REQUIRED_FIELDS = []      
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        # Registration's case-insensitive duplicate checks. Django compiles
+        # __iexact to UPPER(col) = UPPER(%s) on PostgreSQL, so these must be
+        # UPPER() rather than LOWER() to be usable.
+        indexes = [
+            models.Index(Upper('email'), name='user_email_upper'),
+            models.Index(Upper('first_name'), Upper('last_name'), name='user_full_name_upper'),
+        ]
+
     def __str__(self):
         return f"{self.get_full_name()} ({self.role})"
     
@@ -120,6 +134,9 @@ class Appointment(models.Model):
     date = models.DateField()
     time = models.TimeField()
     duration_minutes = models.IntegerField(default=60)
+    # Derived from time + duration_minutes on save, so overlap checks can be
+    # done (and indexed) in the database
+    end_time = models.TimeField(editable=False)
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='pending')
     research_title = models.CharField(max_length=200, validators=[alphanumeric_validator], blank=True)
     
@@ -136,16 +153,174 @@ class Appointment(models.Model):
         help_text="Student's explanation if disputing the meeting status"
     )
     disputed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Set by views to the user making a change; recorded in the transition log
+    changed_by = None
+
+    # Statuses that hold a slot in the consultant's and student's calendars
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['consultant', 'date', 'time'],
+                name='appointment_consultant_active',
+                condition=models.Q(status__in=['pending', 'confirmed']),
+            ),
+            models.Index(
+                fields=['student', 'date', 'time'],
+                name='appointment_student_active',
+                condition=models.Q(status__in=['pending', 'confirmed']),
+            ),
+            # Only the few open disputes are indexed; feeds the admin dispute queue
+            models.Index(
+                fields=['disputed_at', 'id'],
+                name='appointment_dispute_queue',
+                condition=models.Q(status='disputed'),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} — {self.topic}"
 
+    @staticmethod
+    def compute_end_time(start_time, duration_minutes):
+        # Appointments never run past midnight; clamp rather than wrap to 00:xx
+        start = datetime.combine(dt_date.min, start_time)
+        end = start + timedelta(minutes=duration_minutes or 60)
+        return end.time() if end.date() == dt_date.min else dt_time.max
+
+    @classmethod
+    def overlapping(cls, days, start_time, end_time):
+        return cls.objects.filter(
+            date__in=days,
+            status__in=cls.ACTIVE_STATUSES,
+            time__lt=end_time,
+            end_time__gt=start_time,
+        )
+
+    def save(self, *args, **kwargs):
+        self.end_time = self.compute_end_time(self.time, self.duration_minutes)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"time", "duration_minutes"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "end_time"}
+
+        # post_save receivers write the transition log; keep it in the same
+        # transaction as the change itself
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class AppointmentTransitionQuerySet(models.QuerySet):
+    # Bulk edits would bypass the append-only save(). Django's own SET_NULL
+    # cascades go through the base manager, not this queryset.
+
+    def update(self, **kwargs):
+        raise ValueError("Appointment transitions are append-only.")
+
+    def delete(self):
+        raise ValueError("Appointment transitions are append-only.")
+
+
+class AppointmentTransition(models.Model):
+    # Append-only log of Appointment status changes, one row per change.
+    # Ids only grow, so consumers can read incrementally from the last id seen.
+    # Rows outlive their appointment: archiving or deleting it only clears the
+    # foreign key, and appointment_number keeps its id.
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transitions"
+    )
+    appointment_number = models.BigIntegerField(db_index=True)
+    from_status = models.CharField(max_length=30, choices=Appointment.STATUS_CHOICES, null=True, blank=True)
+    to_status = models.CharField(max_length=30, choices=Appointment.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Empty for automatic changes"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AppointmentTransitionQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.appointment_number}: {self.from_status or '—'} → {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Appointment transitions are append-only.")
+        if self.appointment_number is None:
+            self.appointment_number = self.appointment_id
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Appointment transitions are append-only.")
+
+
+class ArchivedAppointment(models.Model):
+    # Cold storage for finished appointments, moved here in batches by
+    # ConsultApp.archive. Same ids and columns as Appointment, plus a
+    # copy of the appointment's transition log.
+    id = models.BigIntegerField(primary_key=True)
+    consultant = models.ForeignKey(Consultant, on_delete=models.CASCADE, related_name="archived_consultant_appointments")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="archived_student_appointments")
+    topic = models.CharField(max_length=100)
+    date = models.DateField()
+    time = models.TimeField()
+    duration_minutes = models.IntegerField(default=60)
+    end_time = models.TimeField()
+    status = models.CharField(max_length=30, choices=Appointment.STATUS_CHOICES)
+    research_title = models.CharField(max_length=200, blank=True)
+    consultant_marked_as = models.CharField(
+        max_length=20,
+        choices=[('completed', 'Completed'), ('not_completed', 'Not Completed')],
+        null=True,
+        blank=True
+    )
+    student_dispute_remark = models.TextField(blank=True, null=True)
+    disputed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+    transitions = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # History pages read the archive newest first, a page at a time
+            models.Index(fields=['student', '-date', '-time', '-id'], name='archived_student_history'),
+            models.Index(fields=['consultant', '-date', '-time', '-id'], name='archived_consultant_history'),
+        ]
+
+    def __str__(self):
+        return f"Archived #{self.id}: {self.topic} ({self.status})"
+
 
 class Feedback(models.Model):
+    # Exactly one of appointment / archived_appointment is set; archiving an
+    # appointment moves its feedback over to the archived row
     appointment = models.OneToOneField(
         Appointment, 
         on_delete=models.CASCADE, 
-        related_name='feedback'
+        related_name='feedback',
+        null=True,
+        blank=True
+    )
+    archived_appointment = models.OneToOneField(
+        ArchivedAppointment,
+        on_delete=models.CASCADE,
+        related_name='feedback',
+        null=True,
+        blank=True
     )
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     consultant = models.ForeignKey(Consultant, on_delete=models.CASCADE)
@@ -227,4 +402,18 @@ class Market(models.Model):
         return []
     
     def is_available_on_day(self, day_name):
-        return day_name.lower() in self.get_available_days_list()
\ No newline at end of file
+        return day_name.lower() in self.get_available_days_list()
+
+class MarketCapacity(models.Model):
+    # Precomputed availability of a listing, maintained by ConsultApp.capacity:
+    # free hours on the booking grid over the window starting window_start,
+    # and the first of them. No row means it hasn't been computed yet.
+    market = models.OneToOneField(Market, on_delete=models.CASCADE, primary_key=True, related_name="capacity")
+    window_start = models.DateField()
+    free_hours = models.PositiveIntegerField(default=0)
+    next_free_date = models.DateField(null=True, blank=True)
+    next_free_time = models.TimeField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Listing #{self.market_id}: {self.free_hours}h free from {self.window_start}"
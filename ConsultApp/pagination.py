@@ -0,0 +1,134 @@
+import base64
+import datetime
+import json
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+# Keyset ("cursor") pagination for the JSON API and long admin lists.
+# A cursor is the ordering key of the last row served, JSON-encoded and
+# base64'd so clients treat it as opaque. Page N costs the same as page 1.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds to milliseconds, which would make a cursor
+    # land before its own row
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=CursorEncoder).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidQuery("Invalid cursor.")
+    return values
+
+
+def keyset_filter(ordering, values):
+    # (a, b, c) after (x, y, z) == a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+def after_cursor(queryset, ordering, cursor):
+    if not cursor:
+        return queryset
+    values = decode_cursor(cursor, len(ordering))
+    try:
+        return queryset.filter(keyset_filter(ordering, values))
+    except (ValidationError, ValueError, TypeError):
+        raise InvalidQuery("Invalid cursor.")
+
+
+def parse_page_size(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except ValueError:
+        raise InvalidQuery("limit must be a number.")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def parse_fields(value, available):
+    if not value:
+        return list(available)
+    requested = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise InvalidQuery(
+            f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."
+        )
+    return requested
+
+
+def paginate_values(queryset, ordering, available_fields, params):
+    # available_fields maps public names to ORM paths or expressions.
+    # Ordering keys are always fetched (aliased) so the next cursor can be
+    # built, and stripped again unless they were asked for.
+    fields = parse_fields(params.get("fields"), available_fields)
+    limit = parse_page_size(params.get("limit"))
+    ordering_names = [field.lstrip("-") for field in ordering]
+
+    queryset = after_cursor(queryset, ordering, params.get("cursor"))
+
+    # Computed fields are aliased too, since their public name may be the
+    # name of a model field
+    columns, projection, keys = [], {}, {}
+    for name in fields:
+        expression = available_fields[name]
+        if expression == name:
+            columns.append(name)
+            keys[name] = name
+        else:
+            keys[name] = f"_field_{name}"
+            projection[keys[name]] = F(expression) if isinstance(expression, str) else expression
+    for name in ordering_names:
+        projection[f"_key_{name}"] = F(name)
+
+    rows = list(queryset.order_by(*ordering).values(*columns, **projection)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor([rows[-1][f"_key_{name}"] for name in ordering_names])
+
+    results = [{name: row[keys[name]] for name in fields} for row in rows]
+    return {"results": results, "next_cursor": next_cursor}
+
+
+def paginate_queryset(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    # Same keyset paging for pages that render model instances
+    queryset = after_cursor(queryset, ordering, cursor)
+    objects = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(objects) > limit:
+        objects = objects[:limit]
+        last = objects[-1]
+        next_cursor = encode_cursor([getattr(last, field.lstrip("-")) for field in ordering])
+    return objects, next_cursor
@@ -0,0 +1,73 @@
+import hashlib
+import math
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Rate limiting for the unauthenticated auth forms.
+# settings.RATE_LIMITS maps a scope ("login", ...) to limits keyed by client
+# IP and/or by the account (email) being tried; each limit is (attempts,
+# window in seconds). Attempts are counted per fixed window with cache.add()
+# and cache.incr(), which are atomic in the shared backends the
+# ConsultApp.W002 check asks for, so parallel requests can't slip a burst
+# past the limit and every worker counts against the same windows.
+
+
+def client_ip(request):
+    if settings.RATE_LIMIT_USE_FORWARDED_FOR:
+        # The right-most address is the one our proxy saw; anything to its
+        # left is client-supplied and can be spoofed
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+        if addresses:
+            return addresses[-1]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _window_key(scope, kind, identity, window):
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+    return f"ratelimit:{scope}:{kind}:{digest}:{window}"
+
+
+def _hit(key, timeout):
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout=timeout)
+        return 1
+
+
+def check_rate_limit(request, scope, account=None):
+    # Counts one attempt against each of the scope's limits and returns 0,
+    # or, if any limit is exceeded, takes the attempt back and returns the
+    # seconds until that window ends
+    limits = settings.RATE_LIMITS.get(scope)
+    if not settings.RATE_LIMIT_ENABLED or not limits:
+        return 0
+
+    identities = {"ip": client_ip(request)}
+    if account:
+        identities["account"] = account.strip().lower()
+
+    now = time.time()
+    counted = []
+    retry_after = 0
+    for kind, (attempts, period) in limits.items():
+        identity = identities.get(kind)
+        if not identity:
+            continue
+        key = _window_key(scope, kind, identity, int(now // period))
+        counted.append(key)
+        if _hit(key, period) > attempts:
+            retry_after = max(retry_after, period - now % period)
+
+    if retry_after:
+        for key in counted:
+            try:
+                cache.decr(key)
+            except ValueError:
+                pass
+        return math.ceil(retry_after)
+    return 0
@@ -0,0 +1,73 @@
+from collections import Counter
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Abs, Coalesce
+from .middleware import invalidate_profile
+from .models import Appointment, ArchivedAppointment, Student
+from .watermarks import touch_user_watermarks
+
+# Student.sessions_completed is a denormalized count of the student's completed
+# appointments. It is only ever changed with UPDATE ... SET col = col + n so
+# concurrent completions can't overwrite each other.
+
+
+def _changed(*student_ids):
+    # update() sends no post_save; do what profile_changed would have done
+    invalidate_profile(*student_ids)
+    touch_user_watermarks(*student_ids)
+
+
+def add_completed_sessions(student_id, count=1):
+    if count:
+        Student.objects.filter(pk=student_id).update(sessions_completed=F('sessions_completed') + count)
+        _changed(student_id)
+
+
+def add_completed_appointments(appointments):
+    # One UPDATE per distinct student for a batch of newly completed appointments
+    per_student = Counter(appointment.student_id for appointment in appointments)
+    for student_id, count in per_student.items():
+        Student.objects.filter(pk=student_id).update(sessions_completed=F('sessions_completed') + count)
+    if per_student:
+        _changed(*per_student)
+
+
+def _completed_count(model):
+    completed = model.objects.filter(
+        student=OuterRef('pk'), status='completed'
+    ).order_by().values('student').annotate(total=Count('id')).values('total')
+    return Coalesce(Subquery(completed), 0)
+
+
+def _actual_completed():
+    # Archived appointments still count towards the student's sessions
+    return _completed_count(Appointment) + _completed_count(ArchivedAppointment)
+
+
+def _with_actual_counts():
+    return Student.objects.annotate(actual_completed=_actual_completed())
+
+
+def session_counter_drift():
+    # One aggregate over all students: how many counters disagree with the
+    # appointments table, and by how much in total
+    return _with_actual_counts().annotate(
+        drift=Abs(F('sessions_completed') - F('actual_completed')),
+    ).aggregate(
+        students=Count('pk'),
+        mismatched=Count('pk', filter=Q(drift__gt=0)),
+        total_drift=Coalesce(Sum('drift'), 0),
+    )
+
+
+def resync_sessions_completed():
+    # Rewrites only the drifted counters from the appointments table.
+    # Returns how many students were corrected.
+    student_ids = list(
+        _with_actual_counts().exclude(sessions_completed=F('actual_completed')).values_list('pk', flat=True)
+    )
+    if not student_ids:
+        return 0
+
+    Student.objects.filter(pk__in=student_ids).update(sessions_completed=_actual_completed())
+    _changed(*student_ids)
+    return len(student_ids)
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import User, Student, Consultant, Admin, Appointment, AppointmentTransition, Market, Feedback, Verification
+from .dashboard_cache import invalidate_dashboards
+from .middleware import invalidate_profile
+from .watermarks import touch_watermarks, touch_user_watermarks
+from .events import publish_appointment_event
+from .capacity import schedule_capacity_refresh
+from .typeahead import invalidate_typeahead
+
+# Student and Consultant use the user as their primary key, so the *_id
+# attributes below are already user ids and no extra queries are needed.
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    # Deferred fields are absent from __dict__; don't trigger a query for them
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_status_changed(sender, instance, created, **kwargs):
+    previous_status = None if created else instance._loaded_status
+    if created or instance.status != previous_status:
+        AppointmentTransition.objects.create(
+            appointment=instance,
+            from_status=previous_status,
+            to_status=instance.status,
+            actor=instance.changed_by,
+        )
+        publish_appointment_event(instance, previous_status)
+        instance._loaded_status = instance.status
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    invalidate_dashboards(instance.student_id, instance.consultant_id)
+    touch_user_watermarks(instance.student_id, instance.consultant_id)
+    # Status changes go through appointment_states, which refreshes capacity
+    # itself; finished appointments (e.g. being archived) hold no slot
+    if instance.status in Appointment.ACTIVE_STATUSES:
+        schedule_capacity_refresh(instance.consultant_id)
+
+
+@receiver([post_save, post_delete], sender=Market)
+def market_changed(sender, instance, **kwargs):
+    invalidate_dashboards(instance.consultant_id)
+    touch_user_watermarks(instance.consultant_id)
+    schedule_capacity_refresh(instance.consultant_id)
+    # Every student dashboard lists marketplace consultants
+    touch_watermarks("market")
+
+
+@receiver([post_save, post_delete], sender=Market)
+@receiver([post_save, post_delete], sender=Consultant)
+@receiver([post_save, post_delete], sender=User)
+def typeahead_source_changed(sender, instance, **kwargs):
+    if sender is User:
+        # Logins only touch last_login; students and admins aren't indexed
+        if instance.role != 'consultant' or kwargs.get('update_fields') == frozenset({'last_login'}):
+            return
+    invalidate_typeahead()
+
+
+@receiver([post_save, post_delete], sender=Feedback)
+def feedback_changed(sender, instance, **kwargs):
+    invalidate_dashboards(instance.student_id, instance.consultant_id)
+    touch_user_watermarks(instance.student_id, instance.consultant_id)
+
+
+@receiver([post_save, post_delete], sender=Verification)
+def verification_changed(sender, instance, **kwargs):
+    invalidate_dashboards(instance.consultant_id)
+    touch_user_watermarks(instance.consultant_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Consultant)
+@receiver([post_save, post_delete], sender=Admin)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
+    touch_user_watermarks(instance.pk)
+    # Consultant dashboards show the total number of students
+    if sender is Student and (kwargs.get('created') or kwargs['signal'] is post_delete):
+        touch_watermarks("students")
+    # Marketplace cards show consultants' names, expertise and verification
+    if sender is Consultant or (
+        sender is User and instance.role == 'consultant'
+        and kwargs.get('update_fields') != frozenset({'last_login'})
+    ):
+        touch_watermarks("market")
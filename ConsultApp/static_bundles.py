@@ -0,0 +1,38 @@
+import re
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+# Per-page stylesheet bundles (settings.STATIC_BUNDLES).
+# `manage.py bundle_static` writes each bundle to STATIC_BUNDLE_ROOT, from where
+# collectstatic picks it up, hashes it and stores gzip/Brotli variants.
+
+BUNDLE_PREFIX = "ConsultApp/bundles"
+
+_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+
+
+def bundle_path(name):
+    return f"{BUNDLE_PREFIX}/{name}.css"
+
+
+def minify_css(css):
+    css = _COMMENT_RE.sub('', css)
+    parts = _STRING_RE.split(css)
+    # Odd indexes are quoted strings and are left untouched
+    for i in range(0, len(parts), 2):
+        chunk = re.sub(r'\s+', ' ', parts[i])
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        parts[i] = chunk.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def build_bundle(name):
+    sources = []
+    for path in settings.STATIC_BUNDLES[name]:
+        absolute_path = finders.find(path)
+        if not absolute_path:
+            raise FileNotFoundError(f"Static file '{path}' in bundle '{name}' was not found.")
+        with open(absolute_path, encoding='utf-8') as f:
+            sources.append(f.read())
+    return sources, minify_css('\n'.join(sources))
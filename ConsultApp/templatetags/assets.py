@@ -0,0 +1,17 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+from ..static_bundles import bundle_path
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle(name):
+    # One hashed, minified file when bundles are built; the source files otherwise
+    if settings.STATIC_BUNDLES_ENABLED:
+        paths = [bundle_path(name)]
+    else:
+        paths = settings.STATIC_BUNDLES[name]
+    return format_html_join('\n  ', '<link rel="stylesheet" href="{}">', ((static(path),) for path in paths))
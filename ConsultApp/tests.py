@@ -1,3 +1,608 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.contrib.messages import get_messages
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .appointment_states import IllegalTransition, bulk_transition, create_appointments, transition
+from .archive import archive_batch
+from .availability import find_common_slots, free_slots, merge_intervals
+from .capacity import capacity_ordering, refresh_capacity
+from .db_router import PIN_COOKIE, REPLICA_ALIAS, ReplicaPinMiddleware, replica_reads
+from .models import Appointment, AppointmentTransition, ArchivedAppointment, Consultant, Feedback, Market, MarketCapacity, Student, User
+from .pagination import encode_cursor
+from .ratelimit import check_rate_limit, client_ip
+from .session_counters import add_completed_appointments, add_completed_sessions, resync_sessions_completed, session_counter_drift
+from .typeahead import POPULAR_PREFIX_ENTRIES, PrefixIndex
 
-# Create your tests here.
+
+def make_student(email="student@cit.edu"):
+    user = User.objects.create_user(email=email, password="pw12345678", first_name="Stu", last_name="Dent", role="student")
+    return Student.objects.create(user=user, student_department="CCS", student_course="BSIT", student_program="BSIT")
+
+
+def make_consultant(email="consultant@cit.edu"):
+    user = User.objects.create_user(email=email, password="pw12345678", first_name="Con", last_name="Sult", role="consultant")
+    return Consultant.objects.create(user=user, contact_number="09123456789", expertise="Statistics", workplace="CIT", is_verified=True)
+
+
+def make_listing(consultant):
+    return Market.objects.create(
+        consultant=consultant, profession="Statistician", rate_per_hour=500, meeting_place="Online",
+        available_from=time(8), available_to=time(17),
+        available_days="monday,tuesday,wednesday,thursday,friday,saturday,sunday",
+    )
+
+
+@skipUnless(connection.vendor == "postgresql", "Expression index plans are checked on PostgreSQL")
+class RegistrationLookupIndexTests(TestCase):
+    # register_view's duplicate checks must be answered from the Upper()
+    # indexes rather than a scan of the user table
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # The test table is tiny; make the planner use any applicable index
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_email_lookup_uses_index(self):
+        plan = User.objects.filter(email__iexact="Someone@cit.edu").explain()
+        self.assertIn("user_email_upper", plan)
+
+    def test_full_name_lookup_uses_index(self):
+        plan = User.objects.filter(first_name__iexact="Ada", last_name__iexact="Lovelace").explain()
+        self.assertIn("user_full_name_upper", plan)
+
+
+@patch("ConsultApp.db_router.replica_enabled", return_value=True)
+class ReplicaPinningTests(SimpleTestCase):
+    # Routing decisions only, so no replica database has to be configured
+
+    def reads_from(self, view, cookies=None):
+        # Runs view through ReplicaPinMiddleware; returns the response and the
+        # alias chosen for reads before and after the view's write
+        routed = []
+
+        @replica_reads
+        def routed_view(request):
+            routed.append(router.db_for_read(Student))
+            if view == "write":
+                router.db_for_write(Student)
+            routed.append(router.db_for_read(Student))
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+        return ReplicaPinMiddleware(routed_view)(request), routed
+
+    def test_reads_use_replica_until_the_request_writes(self, replica_enabled):
+        response, routed = self.reads_from("write")
+        self.assertEqual(routed, [REPLICA_ALIAS, "default"])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_read_only_request_is_not_pinned(self, replica_enabled):
+        response, routed = self.reads_from("read")
+        self.assertEqual(routed, [REPLICA_ALIAS, REPLICA_ALIAS])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_pinned_browser_reads_from_primary(self, replica_enabled):
+        response, routed = self.reads_from("read", cookies={PIN_COOKIE: "1"})
+        self.assertEqual(routed, ["default", "default"])
+
+    def test_async_view_is_pinned_after_a_write(self, replica_enabled):
+        routed = []
+
+        @replica_reads
+        async def routed_view(request):
+            routed.append(await sync_to_async(router.db_for_read)(Student))
+            await sync_to_async(router.db_for_write)(Student)
+            routed.append(router.db_for_read(Student))
+            return HttpResponse()
+
+        middleware = ReplicaPinMiddleware(routed_view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get("/"))
+        self.assertEqual(routed, [REPLICA_ALIAS, "default"])
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMITS={"login": {"ip": (2, 60), "account": (3, 300)}},
+)
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def attempt(self, at, ip="10.0.0.1", account=None):
+        request = RequestFactory().post("/", REMOTE_ADDR=ip)
+        with patch("ConsultApp.ratelimit.time.time", return_value=at):
+            return check_rate_limit(request, "login", account=account)
+
+    def test_limit_applies_within_a_window(self):
+        self.assertEqual(self.attempt(6000), 0)
+        self.assertEqual(self.attempt(6010), 0)
+        # Third attempt in the window starting at 6000; it ends at 6060
+        self.assertEqual(self.attempt(6030), 30)
+
+    def test_next_window_starts_a_new_count(self):
+        for at in (6000, 6001, 6002):
+            self.attempt(at)
+        self.assertEqual(self.attempt(6060), 0)
+
+    def test_rejected_attempts_are_not_counted(self):
+        # Rejections are taken back, so the account limit isn't used up by
+        # attempts the IP limit already refused
+        for _ in range(5):
+            self.attempt(6000, account="a@cit.edu")
+        self.assertEqual(self.attempt(6000, ip="10.0.0.2", account="A@cit.edu "), 0)
+
+    def test_addresses_are_limited_separately(self):
+        self.attempt(6000)
+        self.attempt(6000)
+        self.assertEqual(self.attempt(6000, ip="10.0.0.2"), 0)
+
+    def test_account_limit_spans_addresses(self):
+        for n in range(3):
+            self.assertEqual(self.attempt(6000, ip=f"10.0.1.{n}", account="a@cit.edu"), 0)
+        self.assertGreater(self.attempt(6000, ip="10.0.1.9", account="a@cit.edu"), 0)
+
+
+class ClientIpTests(SimpleTestCase):
+
+    def request(self, forwarded):
+        return RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=forwarded)
+
+    @override_settings(RATE_LIMIT_USE_FORWARDED_FOR=True)
+    def test_uses_address_added_by_the_proxy(self):
+        # The left-most entries are whatever the client sent
+        self.assertEqual(client_ip(self.request("1.2.3.4, 203.0.113.7")), "203.0.113.7")
+
+    @override_settings(RATE_LIMIT_USE_FORWARDED_FOR=True)
+    def test_falls_back_to_remote_addr(self):
+        self.assertEqual(client_ip(self.request(" , ")), "10.0.0.1")
+
+    @override_settings(RATE_LIMIT_USE_FORWARDED_FOR=False)
+    def test_header_ignored_without_a_proxy(self):
+        self.assertEqual(client_ip(self.request("203.0.113.7")), "10.0.0.1")
+
+
+class AppointmentStateTests(TestCase):
+
+    def setUp(self):
+        self.student = make_student()
+        self.consultant = make_consultant()
+        self.actor = self.consultant.user
+
+    def book(self, days_ahead=3, hour=9):
+        return Appointment.objects.create(
+            student=self.student, consultant=self.consultant, topic="Thesis",
+            date=date.today() + timedelta(days=days_ahead), time=time(hour),
+        )
+
+    def log(self, appointment):
+        return list(
+            AppointmentTransition.objects.filter(appointment_number=appointment.id)
+            .values_list("from_status", "to_status", "actor_id")
+        )
+
+    def test_allowed_transition_updates_and_logs(self):
+        appointment = self.book()
+        self.assertTrue(transition(appointment, "confirmed", actor=self.actor))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, "confirmed")
+        self.assertEqual(self.log(appointment), [(None, "pending", None), ("pending", "confirmed", self.actor.id)])
+
+    def test_forbidden_transition_raises(self):
+        appointment = self.book()
+        transition(appointment, "rejected")
+        with self.assertRaises(IllegalTransition):
+            transition(appointment, "confirmed")
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, "rejected")
+
+    def test_lost_race_changes_nothing(self):
+        appointment = self.book()
+        # Someone else confirms it after this copy was loaded
+        Appointment.objects.filter(id=appointment.id).update(status="confirmed")
+        self.assertFalse(transition(appointment, "rejected", actor=self.actor))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, "confirmed")
+        self.assertEqual(self.log(appointment), [(None, "pending", None)])
+
+    def test_bulk_transition_skips_rows_in_other_statuses(self):
+        pending = self.book(hour=9)
+        rejected = self.book(hour=11)
+        transition(rejected, "rejected")
+        moved = bulk_transition([pending.id, rejected.id], ["pending", "confirmed"], "completed", actor=self.actor)
+        self.assertEqual([appointment.id for appointment in moved], [pending.id])
+        self.assertEqual(self.log(pending)[-1], ("pending", "completed", self.actor.id))
+        self.assertEqual(self.log(rejected)[-1], ("pending", "rejected", None))
+
+    def test_bulk_transition_checks_every_source_status(self):
+        with self.assertRaises(IllegalTransition):
+            bulk_transition([self.book().id], ["pending", "completed"], "cancelled")
+
+    def test_create_appointments_logs_each_booking(self):
+        created = create_appointments([
+            Appointment(student=self.student, consultant=self.consultant, topic="Series",
+                        date=date.today() + timedelta(days=7 * week), time=time(10))
+            for week in (1, 2)
+        ], actor=self.student.user)
+        for appointment in created:
+            self.assertEqual(appointment.end_time, time(11))
+            self.assertEqual(self.log(appointment), [(None, "pending", self.student.user_id)])
+
+    def test_log_is_append_only(self):
+        entry = AppointmentTransition.objects.get(appointment_number=self.book().id)
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            AppointmentTransition.objects.update(to_status="completed")
+        with self.assertRaises(ValueError):
+            AppointmentTransition.objects.all().delete()
+
+    def test_log_outlives_the_appointment(self):
+        appointment = self.book()
+        appointment_id = appointment.id
+        appointment.delete()
+        entry = AppointmentTransition.objects.get(appointment_number=appointment_id)
+        self.assertIsNone(entry.appointment_id)
+
+
+class SessionCounterTests(TestCase):
+
+    def setUp(self):
+        self.consultant = make_consultant()
+        self.student = make_student()
+        self.other = make_student("other@cit.edu")
+
+    def complete(self, student, days_ago=2, archived=False):
+        fields = dict(
+            student=student, consultant=self.consultant, topic="Thesis", status="completed",
+            date=date.today() - timedelta(days=days_ago), time=time(9),
+        )
+        if archived:
+            return ArchivedAppointment.objects.create(
+                id=1000 + days_ago, end_time=time(10), updated_at=timezone.now(), **fields
+            )
+        return Appointment.objects.create(**fields)
+
+    def counter(self, student):
+        student.refresh_from_db()
+        return student.sessions_completed
+
+    def test_increments_are_relative(self):
+        add_completed_sessions(self.student.pk, 2)
+        add_completed_appointments([self.complete(self.student), self.complete(self.other)])
+        self.assertEqual(self.counter(self.student), 3)
+        self.assertEqual(self.counter(self.other), 1)
+
+    def test_drift_counts_archived_appointments(self):
+        add_completed_appointments([self.complete(self.student)])
+        self.complete(self.student, days_ago=400, archived=True)
+        self.assertEqual(
+            session_counter_drift(),
+            {"students": 2, "mismatched": 1, "total_drift": 1},
+        )
+
+    def test_resync_rewrites_only_drifted_counters(self):
+        add_completed_appointments([self.complete(self.student), self.complete(self.other)])
+        Student.objects.filter(pk=self.other.pk).update(sessions_completed=5)
+        self.assertEqual(resync_sessions_completed(), 1)
+        self.assertEqual(self.counter(self.other), 1)
+        self.assertEqual(self.counter(self.student), 1)
+        self.assertEqual(session_counter_drift()["mismatched"], 0)
+        self.assertEqual(resync_sessions_completed(), 0)
+
+
+class BookingTests(TestCase):
+
+    def setUp(self):
+        self.student = make_student()
+        self.consultant = make_consultant()
+        make_listing(self.consultant)
+        self.day = date.today() + timedelta(days=7)
+        self.client.force_login(self.student.user)
+
+    def book(self, start="10:00", hours=1, weeks=1):
+        return self.client.post(f"/book-appointment/{self.consultant.pk}/", {
+            "date": self.day.isoformat(), "start_time": start, "duration_hours": hours,
+            "repeat_weeks": weeks, "topic": "Thesis",
+        })
+
+    def existing(self, student, consultant, day, start, hours=1, status="confirmed"):
+        return Appointment.objects.create(
+            student=student, consultant=consultant, topic="Other", status=status,
+            date=day, time=time(start), duration_minutes=hours * 60,
+        )
+
+    def booked(self):
+        return Appointment.objects.filter(student=self.student, consultant=self.consultant)
+
+    def message_texts(self, response):
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_overlapping_consultant_slot_is_rejected(self):
+        self.existing(make_student("other@cit.edu"), self.consultant, self.day, 9, hours=2)
+        response = self.book("10:00")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.booked().exists())
+        self.assertIn("⚠️ This time slot is already booked.", self.message_texts(response))
+
+    def test_student_cannot_double_book_themselves(self):
+        self.existing(self.student, make_consultant("second@cit.edu"), self.day, 10, hours=2)
+        response = self.book("11:00")
+        self.assertFalse(self.booked().exists())
+        self.assertIn("⚠️ You are already busy from 10:00 to 12:00.", self.message_texts(response))
+
+    def test_back_to_back_booking_is_allowed(self):
+        self.existing(make_student("other@cit.edu"), self.consultant, self.day, 9)
+        self.assertRedirects(self.book("10:00"), "/student-dashboard/", fetch_redirect_response=False)
+        self.assertEqual(self.booked().get().end_time, time(11))
+
+    def test_weekly_series_skips_taken_weeks(self):
+        self.existing(make_student("other@cit.edu"), self.consultant, self.day + timedelta(weeks=1), 10)
+        self.book("10:00", weeks=3)
+        self.assertEqual(
+            list(self.booked().order_by("date").values_list("date", "status")),
+            [(self.day, "pending"), (self.day + timedelta(weeks=2), "pending")],
+        )
+
+    def test_pending_series_blocks_another_request(self):
+        self.book("10:00", weeks=2)
+        self.day += timedelta(days=1)
+        response = self.book("10:00", weeks=2)
+        self.assertEqual(self.booked().count(), 2)
+        self.assertTrue(response.context["trigger_pending_modal"])
+
+
+class FreeSlotTests(SimpleTestCase):
+    # A Monday, well in the future
+    day = date(2030, 1, 7)
+    listing = {"available_from": time(8), "available_to": time(12), "available_days": "monday, tuesday"}
+
+    def slots(self, busy=None, duration=60, earliest=None, days=None):
+        earliest = earliest or datetime(2030, 1, 1)
+        return [
+            (day, start // 60, start % 60)
+            for day, start in free_slots(self.listing, days or [self.day], busy or {}, duration, earliest)
+        ]
+
+    def test_merge_intervals(self):
+        self.assertEqual(merge_intervals([(60, 120), (90, 150), (150, 180), (200, 210)]), [[60, 180], [200, 210]])
+
+    def test_slots_resume_on_the_hour_grid_after_a_booking(self):
+        busy = {self.day: [[9 * 60, 10 * 60 + 30]]}
+        self.assertEqual(self.slots(busy), [(self.day, 8, 0), (self.day, 11, 0)])
+
+    def test_slot_must_fit_before_closing(self):
+        self.assertEqual(self.slots(duration=150), [(self.day, 8, 0), (self.day, 9, 0)])
+
+    def test_same_day_slots_start_in_the_future(self):
+        earliest = datetime.combine(self.day, time(9, 15))
+        self.assertEqual(self.slots(earliest=earliest), [(self.day, 10, 0), (self.day, 11, 0)])
+
+    def test_unavailable_weekdays_are_skipped(self):
+        wednesday = self.day + timedelta(days=2)
+        self.assertEqual(self.slots(days=[wednesday]), [])
+
+
+class CommonSlotTests(TestCase):
+
+    def setUp(self):
+        self.first = make_consultant()
+        self.second = make_consultant("second@cit.edu")
+        make_listing(self.first)
+        make_listing(self.second)
+        self.day = date.today() + timedelta(days=7)
+
+    def slots(self, expertise="", limit=20):
+        return [
+            (slot["start_time"], slot["consultant_id"])
+            for slot in find_common_slots(expertise, self.day, self.day, 60, limit=limit)
+        ]
+
+    def test_slots_are_merged_by_start_time(self):
+        Appointment.objects.create(
+            student=make_student(), consultant=self.first, topic="Thesis",
+            date=self.day, time=time(8),
+        )
+        first, second = self.first.pk, self.second.pk
+        self.assertEqual(self.slots(limit=4), [
+            (time(8), second), (time(9), first), (time(9), second), (time(10), first),
+        ])
+
+    def test_each_consultant_offers_a_few_slots(self):
+        self.assertEqual(len(self.slots()), 6)
+
+    def test_expertise_filter(self):
+        Consultant.objects.filter(pk=self.second.pk).update(expertise="Qualitative Methods")
+        self.assertEqual({consultant for _, consultant in self.slots("qualitative")}, {self.second.pk})
+
+
+class ApiPaginationTests(TestCase):
+
+    def setUp(self):
+        student = make_student()
+        consultant = make_consultant()
+        day = date.today() + timedelta(days=7)
+        # Equal (date, time) keys on purpose; id breaks the tie
+        self.ids = [
+            Appointment.objects.create(
+                student=student, consultant=consultant, topic=f"Topic {n}",
+                date=day + timedelta(days=n // 2), time=time(9),
+            ).id
+            for n in range(5)
+        ]
+        Appointment.objects.create(
+            student=make_student("other@cit.edu"), consultant=consultant, topic="Not mine",
+            date=day, time=time(13),
+        )
+        self.client.force_login(student.user)
+
+    def get(self, **params):
+        return self.client.get("/api/appointments/", params)
+
+    def test_cursor_walks_every_row_once(self):
+        seen, params = [], {"limit": 2, "fields": "topic"}
+        while True:
+            page = self.get(**params).json()
+            self.assertLessEqual(len(page["results"]), 2)
+            seen += [row["topic"] for row in page["results"]]
+            if not page["next_cursor"]:
+                break
+            params["cursor"] = page["next_cursor"]
+        self.assertEqual(seen, [f"Topic {n}" for n in range(5)])
+
+    def test_requested_fields_only(self):
+        rows = self.get(fields="id,status").json()["results"]
+        self.assertEqual(rows[0], {"id": self.ids[0], "status": "pending"})
+
+    def test_bad_requests_are_rejected(self):
+        for params in (
+            {"cursor": "not a cursor!"},
+            {"cursor": encode_cursor([1])},
+            {"cursor": encode_cursor(["someday", "noon", 1])},
+            {"limit": "many"},
+            {"fields": "id,password"},
+        ):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.student = make_student()
+        self.consultant = make_consultant()
+        self.cutoff = date.today() - timedelta(days=180)
+
+    def finished(self, status="completed", days_before_cutoff=10):
+        appointment = Appointment.objects.create(
+            student=self.student, consultant=self.consultant, topic="Thesis",
+            date=self.cutoff - timedelta(days=days_before_cutoff), time=time(9),
+        )
+        transition(appointment, status, actor=self.consultant.user)
+        return appointment
+
+    def test_moves_only_finished_appointments_before_the_cutoff(self):
+        moved = [self.finished(), self.finished("cancelled", 20)]
+        recent = self.finished(days_before_cutoff=-1)
+        Appointment.objects.create(
+            student=self.student, consultant=self.consultant, topic="Old request",
+            date=self.cutoff - timedelta(days=30), time=time(9),
+        )
+        self.assertEqual(archive_batch(self.cutoff, 10), 2)
+        self.assertEqual(
+            sorted(ArchivedAppointment.objects.values_list("id", flat=True)),
+            sorted(appointment.id for appointment in moved),
+        )
+        self.assertTrue(Appointment.objects.filter(id=recent.id).exists())
+        self.assertEqual(archive_batch(self.cutoff, 10), 0)
+
+    def test_batches_are_bounded(self):
+        for days in (10, 11, 12):
+            self.finished(days_before_cutoff=days)
+        self.assertEqual(archive_batch(self.cutoff, 2), 2)
+        self.assertEqual(archive_batch(self.cutoff, 2), 1)
+
+    def test_feedback_moves_to_the_archived_row(self):
+        appointment = self.finished()
+        feedback = Feedback.objects.create(
+            appointment=appointment, student=self.student, consultant=self.consultant, rating=4,
+        )
+        archive_batch(self.cutoff, 10)
+        feedback.refresh_from_db()
+        self.assertIsNone(feedback.appointment_id)
+        self.assertEqual(feedback.archived_appointment_id, appointment.id)
+        self.assertEqual(ArchivedAppointment.objects.get(id=appointment.id).feedback, feedback)
+
+    def test_transition_log_is_copied_and_kept(self):
+        appointment = self.finished()
+        archive_batch(self.cutoff, 10)
+        archived = ArchivedAppointment.objects.get(id=appointment.id)
+        self.assertEqual(
+            [(entry["from_status"], entry["to_status"]) for entry in archived.transitions],
+            [(None, "pending"), ("pending", "completed")],
+        )
+        self.assertEqual(archived.transitions[1]["actor_id"], self.consultant.pk)
+        self.assertEqual(
+            list(AppointmentTransition.objects.filter(appointment_number=appointment.id).values_list("appointment_id", flat=True)),
+            [None, None],
+        )
+
+
+class PrefixIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        # Already in rank order, as build_index() passes them
+        self.index = PrefixIndex([
+            self.listing("Ana Reyes", "Statistician", "Survey Design"),
+            self.listing("Ben Santos", "Editor", "Statistics, Grammar"),
+            self.listing("Stella Cruz", "Researcher", "Qualitative Methods"),
+            self.listing("Tom Lim", "Statistician", "Econometrics"),
+        ])
+
+    def listing(self, name, profession="", expertise=""):
+        return {"consultant_name": name, "profession": profession, "expertise": expertise}
+
+    def names(self, index, query, limit=10):
+        return [listing["consultant_name"] for listing in index.search(query, limit)]
+
+    def test_prefix_matches_any_field_case_insensitively(self):
+        self.assertEqual(self.names(self.index, "QUAL"), ["Stella Cruz"])
+        self.assertEqual(self.names(self.index, "econ"), ["Tom Lim"])
+
+    def test_name_beats_profession_beats_expertise(self):
+        self.assertEqual(self.names(self.index, "st"), ["Stella Cruz", "Ana Reyes", "Tom Lim", "Ben Santos"])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.names(self.index, "stat survey"), ["Ana Reyes"])
+        self.assertEqual(self.names(self.index, "stat gram"), ["Ben Santos"])
+        self.assertEqual(self.names(self.index, "stat zoology"), [])
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.names(self.index, "s", limit=2)), 2)
+        self.assertEqual(self.names(self.index, "  ,. "), [])
+
+    def test_popular_prefixes_match_like_others(self):
+        count = POPULAR_PREFIX_ENTRIES + 10
+        index = PrefixIndex([
+            self.listing(f"Consultant {n:03}", expertise="Statistics") for n in range(count)
+        ])
+        self.assertIn("stat", index.popular)
+        self.assertEqual(len(self.names(index, "stat", limit=count)), count)
+        self.assertEqual(self.names(index, "stat 005"), ["Consultant 005"])
+
+
+class CapacityOrderingTests(TestCase):
+
+    def setUp(self):
+        self.first = make_listing(make_consultant())
+        self.second = make_listing(make_consultant("second@cit.edu"))
+        refresh_capacity()
+
+    def ordered(self):
+        return list(Market.objects.order_by(*capacity_ordering()).values_list("id", flat=True))
+
+    def test_sooner_free_slot_sorts_first(self):
+        MarketCapacity.objects.filter(market=self.first).update(next_free_date=date.today() + timedelta(days=3))
+        self.assertEqual(self.ordered(), [self.second.id, self.first.id])
+
+    def test_stale_rows_sort_last(self):
+        yesterday = date.today() - timedelta(days=1)
+        MarketCapacity.objects.filter(market=self.second).update(
+            next_free_date=date.today() + timedelta(days=3),
+        )
+        MarketCapacity.objects.filter(market=self.first).update(
+            window_start=yesterday, next_free_date=yesterday, next_free_time=time(8),
+        )
+        self.assertEqual(self.ordered(), [self.second.id, self.first.id])
@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from itertools import product
+from django.db import transaction
+from .models import Market
+from .watermarks import get_watermarks, touch_watermarks
+
+# Marketplace typeahead.
+# Each worker keeps a sorted list of (word, listing) entries for every active
+# listing of a verified consultant, so a prefix's matches are one bisect away.
+# Market, Consultant and consultant User changes bump the "typeahead"
+# watermark, and every worker sharing the cache rebuilds on its next lookup.
+# With a per-process cache other workers can't see the bump, so an index is
+# also rebuilt once it is TYPEAHEAD_MAX_AGE seconds old.
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 25
+TYPEAHEAD_MAX_AGE = 300
+
+# Lower is better: a name match ranks above a profession match, which ranks
+# above an expertise match
+NAME, PROFESSION, EXPERTISE = 0, 1, 2
+WEIGHTS = (NAME, PROFESSION, EXPERTISE)
+
+# Prefixes matching more entries than this get their bitmasks built once per
+# index instead of on every keystroke
+POPULAR_PREFIX_ENTRIES = 64
+
+# Further query words are ignored
+MAX_QUERY_WORDS = 4
+
+WORD_RE = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+_index_built_at = 0.0
+
+
+def words(text):
+    return WORD_RE.findall((text or "").casefold())
+
+
+class PrefixIndex:
+    # Matches are bitmasks over listing positions, one per weight, so several
+    # query words combine with a few big-int ANDs and the best results are the
+    # lowest set bits of the best-scoring mask.
+
+    def __init__(self, listings):
+        # listings: result dicts, already in rank order
+        self.listings = listings
+        self.mask_bytes = len(listings) // 8 + 1
+        entries = []
+        for position, listing in enumerate(listings):
+            tokens = {}
+            for weight, text in (
+                (NAME, listing["consultant_name"]),
+                (PROFESSION, listing["profession"]),
+                (EXPERTISE, listing["expertise"]),
+            ):
+                for word in words(text):
+                    tokens[word] = min(weight, tokens.get(word, weight))
+            entries.extend((word, weight, position) for word, weight in tokens.items())
+
+        entries.sort()
+        self.keys = [word for word, _, _ in entries]
+        self.hits = [(weight, position) for _, weight, position in entries]
+
+        self.popular = {}
+        for word in dict.fromkeys(self.keys):
+            for length in range(1, len(word) + 1):
+                prefix = word[:length]
+                if prefix in self.popular:
+                    continue
+                start, end = self._range(prefix)
+                if end - start <= POPULAR_PREFIX_ENTRIES:
+                    break
+                self.popular[prefix] = self._build_masks(start, end)
+
+    def _range(self, prefix):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + "\U0010ffff")
+
+    def _build_masks(self, start, end):
+        best = {}
+        for weight, position in self.hits[start:end]:
+            if weight < best.get(position, EXPERTISE + 1):
+                best[position] = weight
+
+        bitmaps = [bytearray(self.mask_bytes) for _ in WEIGHTS]
+        for position, weight in best.items():
+            bitmaps[weight][position >> 3] |= 1 << (position & 7)
+        return tuple(int.from_bytes(bitmap, "little") for bitmap in bitmaps)
+
+    def _masks(self, prefix):
+        # Listings whose best match for prefix has each weight
+        masks = self.popular.get(prefix)
+        if masks is None:
+            masks = self._build_masks(*self._range(prefix))
+        return masks
+
+    def search(self, query, limit=TYPEAHEAD_LIMIT):
+        prefixes = list(dict.fromkeys(words(query)))[:MAX_QUERY_WORDS]
+        if not prefixes:
+            return []
+
+        # Every word must match; a listing's score is the sum of its weights
+        by_score = {}
+        for combination in product(WEIGHTS, repeat=len(prefixes)):
+            mask = -1
+            for prefix, weight in zip(prefixes, combination):
+                mask &= self._masks(prefix)[weight]
+                if not mask:
+                    break
+            if mask:
+                score = sum(combination)
+                by_score[score] = by_score.get(score, 0) | mask
+
+        positions = []
+        for score in sorted(by_score):
+            mask = by_score[score]
+            while mask and len(positions) < limit:
+                lowest = mask & -mask
+                positions.append(lowest.bit_length() - 1)
+                mask ^= lowest
+        return [self.listings[position] for position in positions]
+
+
+def build_index():
+    listings = (
+        Market.objects
+        .filter(is_active=True, consultant__is_verified=True)
+        .order_by("consultant__user__first_name", "consultant__user__last_name", "id")
+        .values(
+            "id", "consultant_id", "consultant__user__first_name", "consultant__user__last_name",
+            "profession", "consultant__expertise", "rate_per_hour",
+        )
+    )
+    return PrefixIndex([
+        {
+            "id": listing["id"],
+            "consultant_id": listing["consultant_id"],
+            "consultant_name": f"{listing['consultant__user__first_name']} {listing['consultant__user__last_name']}".strip(),
+            "profession": listing["profession"],
+            "expertise": listing["consultant__expertise"] or "",
+            "rate_per_hour": listing["rate_per_hour"],
+        }
+        for listing in listings
+    ])
+
+
+def _is_current(version):
+    return (
+        _index is not None
+        and _index_version == version
+        and time.monotonic() - _index_built_at < TYPEAHEAD_MAX_AGE
+    )
+
+
+def get_index():
+    global _index, _index_version, _index_built_at
+    version = get_watermarks("typeahead")[0]
+    if not _is_current(version):
+        with _lock:
+            if not _is_current(version):
+                _index = build_index()
+                _index_version = version
+                _index_built_at = time.monotonic()
+    return _index
+
+
+def search_listings(query, limit=TYPEAHEAD_LIMIT):
+    return get_index().search(query, limit)
+
+
+def invalidate_typeahead():
+    # After commit, so a worker rebuilding in between can't index the old
+    # data under the new version
+    transaction.on_commit(lambda: touch_watermarks("typeahead"))
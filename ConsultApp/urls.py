@@ -18,6 +18,11 @@ urlpatterns = [
     path('consultant-dashboard/', views.consultant_dashboard, name='consultant_dashboard'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
 
+    # Async dashboards (serve under ASGI, e.g. uvicorn ResearchMate.asgi:application)
+    path('async/student-dashboard/', views.student_dashboard_async, name='student_dashboard_async'),
+    path('async/consultant-dashboard/', views.consultant_dashboard_async, name='consultant_dashboard_async'),
+    path('async/admin-dashboard/', views.admin_dashboard_async, name='admin_dashboard_async'),
+
     # Consultant
     path('consultant-verification/', views.consultant_verification_view, name='consultant_verification'),
     path('consultant-appointments/', views.consultant_appointments_view, name='consultant_appointments'),
@@ -42,6 +47,19 @@ urlpatterns = [
     path("appointments/cancel/<int:appointment_id>/", views.cancel_appointment, name="cancel_appointment"),
     path('consultant-details/<int:consultant_user_id>/', views.consultant_details, name='consultant_details'),
     
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
+    path('appointment/events/', views.appointment_events, name='appointment_events'),
+
+    # Read-only JSON API
+    path('api/appointments/', views.api_appointments, name='api_appointments'),
+    path('api/appointments/transitions/', views.api_appointment_transitions, name='api_appointment_transitions'),
+    path('api/market/', views.api_market, name='api_market'),
+    path('api/market/typeahead/', views.api_market_typeahead, name='api_market_typeahead'),
+    path('api/consultants/', views.api_consultants, name='api_consultants'),
+    path('api/feedback/', views.api_feedback, name='api_feedback'),
+    path('api/available-slots/', views.api_available_slots, name='api_available_slots'),
+    
     # NEW: Student confirm or dispute
     path('appointment/confirm-or-dispute/<int:appointment_id>/', views.student_confirm_or_dispute, name='student_confirm_or_dispute'),
 
@@ -50,6 +68,8 @@ urlpatterns = [
     path('admin-students/', views.admin_students_view, name='admin_students'),
     path('admin-profile/', views.admin_profile_view, name='admin_profile'),
     path('admin-reports/', views.admin_reports_view, name='admin_reports'),
+    path('admin-metrics/', views.admin_metrics_view, name='admin_metrics'),
+    path('admin-disputes/', views.admin_dispute_queue, name='admin_dispute_queue'),
     path('admin-student-details/<int:student_id>/', views.student_profile_admin_view, name='student_profile_view'),
     path('admin-sync-sessions/', views.sync_sessions_completed, name='sync_sessions_completed'),
     path('admin-consultant-details/<int:consultant_id>/', views.consultant_profile_admin_view, name='consultant_profile_view'),
@@ -60,6 +80,7 @@ urlpatterns = [
     # Verification (Admin Actions)
     path("approve-consultant/<int:verification_id>/", views.approve_consultant, name="approve_consultant"),
     path("reject-consultant/<int:verification_id>/", views.reject_consultant, name="reject_consultant"),
+    path("bulk-review-verifications/", views.bulk_review_verifications, name="bulk_review_verifications"),
     path("verification-details/<int:verification_id>/", views.verification_details, name="verification_details"),
 ]
 
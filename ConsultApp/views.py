@@ -1,28 +1,51 @@
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import redirect, render, get_object_or_404
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth import authenticate, login, get_user_model, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.views.decorators.http import require_POST
-from datetime import datetime, timedelta, time as dt_time, datetime as dt_datetime
-from .models import User, Student, Consultant, Admin, Appointment, Verification, Market, Feedback
+from django.views.decorators.http import require_POST, condition
+from datetime import datetime, timedelta, time as dt_time, datetime as dt_datetime, timezone as dt_timezone
+from .models import User, Student, Consultant, Admin, Appointment, AppointmentTransition, ArchivedAppointment, Verification, Market, Feedback
 from django.db.models import Prefetch, Case, When, Value, BooleanField
 from supabase import create_client, Client 
 from django.core.files.uploadedfile import UploadedFile
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode, urlencode
 from django.utils.encoding import force_bytes, force_str
 from django.template.loader import render_to_string
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.conf import settings
 from django.urls import reverse
-from django.db.models import Q
+from django.db.models import Q, F, Max, Count, CharField, Exists, OuterRef
+from django.db.models.functions import Coalesce, Concat
+from django.core import signing
+from django.db import transaction, IntegrityError
 import re
 import mimetypes
 import json
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from .dashboard_cache import get_dashboard_data, aget_dashboard_data, dashboard_cache_stats, invalidate_dashboards
+from .db_metrics import database_pool_stats
+from .db_router import replica_reads
+from .watermarks import conditional_page, touch_watermarks, touch_user_watermarks
+from .middleware import invalidate_profile
+from .events import subscribe, unsubscribe
+from .pagination import paginate_values, paginate_queryset, InvalidQuery
+from .ratelimit import check_rate_limit
+from .appointment_states import transition, bulk_transition, create_appointments, IllegalTransition
+from .availability import find_common_slots, MAX_WINDOW_DAYS
+from .archive import archived_status_counts
+from .typeahead import invalidate_typeahead, search_listings, TYPEAHEAD_LIMIT, TYPEAHEAD_MAX_LIMIT
+from .capacity import with_capacity, capacity_ordering, has_stale_capacity, refresh_stale_capacity, CAPACITY_WINDOW_DAYS, LOW_CAPACITY_HOURS
+from .session_counters import add_completed_sessions, add_completed_appointments, session_counter_drift, resync_sessions_completed
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 # Initializing client connection
 try:
@@ -73,6 +96,44 @@ def get_avatar_url(user_id):
     except Exception:
         return None
 
+# Role profile helper functions
+# RoleProfileMiddleware already loaded the user's own profile; only query when
+# it isn't the requested kind.
+def get_role_profile(request, model, create=False, required=False):
+    profile = getattr(request, 'profile', None)
+    if isinstance(profile, model):
+        return profile
+
+    if create:
+        profile, _ = model.objects.get_or_create(user=request.user)
+        return profile
+
+    profile = model.objects.filter(user=request.user).first()
+    if profile is None and required:
+        raise model.DoesNotExist(f"{model.__name__} profile not found.")
+    return profile
+
+def get_role_profile_or_404(request, model):
+    profile = get_role_profile(request, model)
+    if profile is None:
+        raise Http404(f"{model.__name__} profile not found.")
+    return profile
+
+# Async helpers for the ASGI dashboard views
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+async def aget_avatar_urls(user_ids, timestamp):
+    # Storage lookups run in worker threads so they overlap instead of queueing
+    user_ids = list(dict.fromkeys(user_ids))
+    urls = await asyncio.gather(*(
+        sync_to_async(get_avatar_url, thread_sensitive=False)(user_id) for user_id in user_ids
+    ))
+    return {
+        user_id: f"{url}?t={timestamp}" if url else None
+        for user_id, url in zip(user_ids, urls)
+    }
+
 # Validation helper functions
 def validate_name(name):
     if not name or not name.strip():
@@ -114,6 +175,72 @@ def validate_expertise_list(text, field_name="Expertise", max_length=1000):
         return False, f"Too many items selected (max {max_length} characters)."
     return True, ""
 
+def past_appointments_q():
+    now = timezone.now()
+    return Q(date__lt=now.date()) | Q(date=now.date(), time__lt=now.time())
+
+def complete_past_appointments(student):
+    past = Appointment.objects.filter(
+        past_appointments_q(), student=student, status__in=["pending", "confirmed"]
+    )
+    completed = bulk_transition(past.values('id'), ["pending", "confirmed"], "completed")
+    add_completed_sessions(student.pk, len(completed))
+
+def complete_own_past_appointments(request):
+    # Runs before the ETag check so a newly past appointment changes the ETag
+    student = get_role_profile(request, Student)
+    if student:
+        complete_past_appointments(student)
+
+def apply_transition(request, appointment, to_status, **changes):
+    try:
+        if transition(appointment, to_status, actor=request.user, **changes):
+            return True
+    except IllegalTransition:
+        pass
+    messages.error(request, "This appointment has already been updated. Please refresh and try again.")
+    return False
+
+HISTORY_ORDERING = ("-date", "-time", "-id")
+HISTORY_ARCHIVE_PAGE_SIZE = 20
+
+def history_appointments(request, hot_appointments, archived_appointments):
+    # Recent (hot) history first; the archive is only read a page at a time
+    # once the user pages back to older sessions with ?archived=1
+    if request.GET.get("archived") != "1":
+        return list(hot_appointments.order_by(*HISTORY_ORDERING)), {
+            "has_archived": archived_appointments.exists(),
+        }
+
+    appointments, next_cursor = paginate_queryset(
+        archived_appointments, HISTORY_ORDERING, request.GET.get("cursor"), HISTORY_ARCHIVE_PAGE_SIZE
+    )
+    return appointments, {"archived_page": True, "next_cursor": next_cursor}
+
+def consultant_filter_choices(*appointment_querysets):
+    # Distinct consultants of the given appointments for the filter dropdowns,
+    # in one values() query (a UNION when given several). Anyone else can be
+    # looked up through api_consultants.
+    choices = [
+        qs.order_by().values("consultant_id", name=full_name("consultant__user"))
+        for qs in appointment_querysets
+    ]
+    if len(choices) > 1:
+        choices = choices[0].union(*choices[1:])
+    else:
+        choices = choices[0].distinct()
+    return sorted(choices, key=lambda choice: choice["name"].lower())
+
+def format_retry_after(seconds):
+    if seconds < 60:
+        return f"{seconds} second{'s' if seconds != 1 else ''}"
+    minutes = -(-seconds // 60)
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+def rate_limited(response, retry_after):
+    response["Retry-After"] = str(retry_after)
+    return response
+
 # 🔹 Landing Page
 def home_view(request):
     return render(request, "ConsultApp/landing-page.html")
@@ -157,6 +284,11 @@ def register_view(request):
         if errors:
             return redirect(request.path_info + '?show_signup=true')
 
+        retry_after = check_rate_limit(request, "register", account=email)
+        if retry_after:
+            messages.error(request, f"Too many sign-up attempts. Please try again in {format_retry_after(retry_after)}.", extra_tags="general_error")
+            return rate_limited(redirect(request.path_info + '?show_signup=true'), retry_after)
+
         if password and confirm_password and password != confirm_password:
             messages.error(request, "Passwords do not match.", extra_tags="confirm_password_error")
             return redirect(request.path_info + '?show_signup=true')
@@ -240,6 +372,11 @@ def login_view(request):
         if errors:
             return redirect("login")
 
+        retry_after = check_rate_limit(request, "login", account=email)
+        if retry_after:
+            messages.error(request, f"Too many login attempts. Please try again in {format_retry_after(retry_after)}.", extra_tags="general_login_error")
+            return rate_limited(render(request, "ConsultApp/login-register-new.html", {"form_source": "login"}, status=429), retry_after)
+
         user = authenticate(request, email=email, password=password)
 
         if user is None:
@@ -267,22 +404,7 @@ def logout_view(request):
     return redirect("login")
 
 # 🔹 Consultant Views
-@login_required
-def consultant_dashboard(request):
-    consultant_user = request.user
-    consultant = Consultant.objects.filter(user=consultant_user).first()
-    
-    base_avatar_url = get_avatar_url(consultant_user.id)
-    avatar_url = None
-    if base_avatar_url:
-        timestamp = request.session.get('avatar_version', int(datetime.now().timestamp()))
-        avatar_url = f"{base_avatar_url}?t={timestamp}"
-
-    def attach_avatar(person):
-        user_id = person.user.id if hasattr(person, 'user') else person.student.user.id
-        url = get_avatar_url(user_id)
-        return f"{url}?t={timestamp}" if url else None
-
+def build_consultant_dashboard_data(consultant_user, consultant):
     pending_verification = Verification.objects.filter(
         consultant=consultant_user, status='pending'
     ).exists()
@@ -297,35 +419,87 @@ def consultant_dashboard(request):
             consultant=consultant_user, status='rejected'
         ).order_by('-reviewed_at').first()
 
-    total_students = Student.objects.count()
-    total_appointments = Appointment.objects.filter(consultant=consultant).count() if consultant else 0
-        
+    total_appointments = (
+        Appointment.objects.filter(consultant=consultant).count()
+        + ArchivedAppointment.objects.filter(consultant=consultant).count()
+    ) if consultant else 0
+
     assigned_students = list(Student.objects.filter(
         student_appointments__consultant=consultant,
         student_appointments__status='confirmed'
     ).select_related('user').distinct()) if consultant else []
 
-    for stud in assigned_students:
-        stud.avatar_url = attach_avatar(stud)
-
     pending_appointments = list(Appointment.objects.filter(
         consultant=consultant, status='pending'
     ).select_related('student__user'))
-    
-    for appt in pending_appointments:
-        appt.student.avatar_url = attach_avatar(appt.student)
 
     confirmed_appointments = list(Appointment.objects.filter(
         consultant=consultant, status='confirmed'
     ).select_related('student__user'))
 
-    for appt in confirmed_appointments:
-        appt.student.avatar_url = attach_avatar(appt.student)
-    
-    cancelled_appointments = Appointment.objects.filter(consultant=consultant, status='cancelled')
+    cancelled_appointments = list(Appointment.objects.filter(consultant=consultant, status='cancelled'))
 
     market_listing = Market.objects.filter(consultant=consultant).first() if consultant else None
+
+    consultant_feedbacks = []
+    average_rating = 0
+
+    if consultant:
+        consultant_feedbacks = list(Feedback.objects.filter(
+            consultant=consultant
+        ).select_related('student__user').order_by('-created_at')[:10])
+
+        if consultant_feedbacks:
+            total = sum(f.rating for f in consultant_feedbacks)
+            average_rating = total / len(consultant_feedbacks)
+
+    return {
+        "pending_verification": pending_verification,
+        "approved_verification": approved_verification,
+        "rejected_verification": rejected_verification,
+        "total_appointments": total_appointments,
+        "students": assigned_students,
+        "pending_appointments": pending_appointments,
+        "appointments": confirmed_appointments,
+        "cancelled_appointments": cancelled_appointments,
+        "market_listing": market_listing,
+        "consultant_feedbacks": consultant_feedbacks,
+        "average_rating": average_rating,
+    }
+
+@login_required
+@conditional_page("students")
+def consultant_dashboard(request):
+    consultant_user = request.user
+    consultant = get_role_profile(request, Consultant)
     
+    base_avatar_url = get_avatar_url(consultant_user.id)
+    avatar_url = None
+    timestamp = request.session.get('avatar_version', int(datetime.now().timestamp()))
+    if base_avatar_url:
+        avatar_url = f"{base_avatar_url}?t={timestamp}"
+
+    def attach_avatar(person):
+        user_id = person.user.id if hasattr(person, 'user') else person.student.user.id
+        url = get_avatar_url(user_id)
+        return f"{url}?t={timestamp}" if url else None
+
+    data = get_dashboard_data(
+        "consultant", consultant_user.id,
+        lambda: build_consultant_dashboard_data(consultant_user, consultant),
+    )
+
+    for stud in data["students"]:
+        stud.avatar_url = attach_avatar(stud)
+
+    for appt in data["pending_appointments"]:
+        appt.student.avatar_url = attach_avatar(appt.student)
+
+    for appt in data["appointments"]:
+        appt.student.avatar_url = attach_avatar(appt.student)
+
+    market_listing = data["market_listing"]
+
     if market_listing and consultant and consultant.expertise:
         market_listing.expertise_list = [
             x.strip() for x in consultant.expertise.split(',') if x.strip()
@@ -336,37 +510,115 @@ def consultant_dashboard(request):
             x.strip() for x in consultant.expertise.split(',') if x.strip()
         ]
 
-    consultant_feedbacks = []
-    average_rating = 0
-    
-    if consultant:
-        consultant_feedbacks = Feedback.objects.filter(
-            consultant=consultant
-        ).select_related('student__user').order_by('-created_at')[:10]
-        
-        if consultant_feedbacks:
-            total = sum(f.rating for f in consultant_feedbacks)
-            average_rating = total / len(consultant_feedbacks)
-
     context = {
+        **data,
         "consultant": consultant,
         "consultant_name": consultant_user.get_full_name(),
+        "total_students": Student.objects.count(),
+        "avatar_url": avatar_url,
+    }
+
+    return render(request, "ConsultApp/consultant-dashboard.html", context)
+
+async def abuild_consultant_dashboard_data(consultant_user, consultant):
+    verifications = Verification.objects.filter(consultant=consultant_user)
+    appointments = Appointment.objects.filter(consultant=consultant) if consultant else Appointment.objects.none()
+    archived_appointments = ArchivedAppointment.objects.filter(consultant=consultant) if consultant else ArchivedAppointment.objects.none()
+    students = Student.objects.filter(
+        student_appointments__consultant=consultant,
+        student_appointments__status='confirmed'
+    ) if consultant else Student.objects.none()
+    feedbacks = Feedback.objects.filter(consultant=consultant) if consultant else Feedback.objects.none()
+    markets = Market.objects.filter(consultant=consultant) if consultant else Market.objects.none()
+
+    (
+        pending_verification,
+        approved_verification,
+        rejected_verification,
+        total_appointments,
+        archived_total,
+        assigned_students,
+        pending_appointments,
+        confirmed_appointments,
+        cancelled_appointments,
+        market_listing,
+        consultant_feedbacks,
+    ) = await asyncio.gather(
+        verifications.filter(status='pending').aexists(),
+        verifications.filter(status='approved').order_by('-reviewed_at').afirst(),
+        verifications.filter(status='rejected').order_by('-reviewed_at').afirst(),
+        appointments.acount(),
+        archived_appointments.acount(),
+        alist(students.select_related('user').distinct()),
+        alist(appointments.filter(status='pending').select_related('student__user')),
+        alist(appointments.filter(status='confirmed').select_related('student__user')),
+        alist(appointments.filter(status='cancelled')),
+        markets.afirst(),
+        alist(feedbacks.select_related('student__user').order_by('-created_at')[:10]),
+    )
+
+    total_appointments += archived_total
+    if pending_verification or approved_verification:
+        rejected_verification = None
+
+    average_rating = 0
+    if consultant_feedbacks:
+        average_rating = sum(f.rating for f in consultant_feedbacks) / len(consultant_feedbacks)
+
+    return {
         "pending_verification": pending_verification,
         "approved_verification": approved_verification,
         "rejected_verification": rejected_verification,
-        "total_students": total_students,
         "total_appointments": total_appointments,
-        "appointments": confirmed_appointments,
         "students": assigned_students,
         "pending_appointments": pending_appointments,
+        "appointments": confirmed_appointments,
         "cancelled_appointments": cancelled_appointments,
         "market_listing": market_listing,
         "consultant_feedbacks": consultant_feedbacks,
         "average_rating": average_rating,
-        "avatar_url": avatar_url,
     }
 
-    return render(request, "ConsultApp/consultant-dashboard.html", context)
+@login_required
+async def consultant_dashboard_async(request):
+    consultant_user = await request.auser()
+    timestamp = await request.session.aget('avatar_version', int(datetime.now().timestamp()))
+
+    consultant = request.profile if isinstance(request.profile, Consultant) else None
+    if consultant is None:
+        consultant = await Consultant.objects.filter(user=consultant_user).afirst()
+    total_students = await Student.objects.acount()
+
+    data = await aget_dashboard_data(
+        "consultant", consultant_user.id,
+        lambda: abuild_consultant_dashboard_data(consultant_user, consultant),
+    )
+
+    people = data["students"] + [
+        appt.student for appt in data["pending_appointments"] + data["appointments"]
+    ]
+    avatars = await aget_avatar_urls(
+        [consultant_user.id] + [person.user_id for person in people], timestamp
+    )
+    for person in people:
+        person.avatar_url = avatars[person.user_id]
+
+    expertise_list = []
+    if consultant and consultant.expertise:
+        expertise_list = [x.strip() for x in consultant.expertise.split(',') if x.strip()]
+        consultant.expertise_list = expertise_list
+        if data["market_listing"]:
+            data["market_listing"].expertise_list = expertise_list
+
+    context = {
+        **data,
+        "consultant": consultant,
+        "consultant_name": consultant_user.get_full_name(),
+        "total_students": total_students,
+        "avatar_url": avatars[consultant_user.id],
+    }
+
+    return await sync_to_async(render)(request, "ConsultApp/consultant-dashboard.html", context)
 
 @login_required
 def update_appointment_status(request, appointment_id):
@@ -376,47 +628,48 @@ def update_appointment_status(request, appointment_id):
         action = request.POST.get('action')
 
         if action in ['approve', 'accept']:
-            appointment.status = 'confirmed'
-            appointment.save()
+            if apply_transition(request, appointment, 'confirmed'):
+                student = appointment.student
+                consultant = appointment.consultant
 
-            student = appointment.student
-            consultant = appointment.consultant
+                if not student.assigned_consultant:
+                    student.assigned_consultant = consultant
 
-            if not student.assigned_consultant:
-                student.assigned_consultant = consultant
+                if appointment.topic and (not student.student_program or student.student_program.lower() == "undecided"):
+                    student.student_program = appointment.topic
 
-            if appointment.topic and (not student.student_program or student.student_program.lower() == "undecided"):
-                student.student_program = appointment.topic
+                student.save(update_fields=["assigned_consultant", "student_program"])
 
-            student.save()
-
-            messages.success(
-                request,
-                f"Appointment with {student.user.get_full_name()} approved successfully. "
-                f"Student’s program and topic have been updated."
-            )
+                messages.success(
+                    request,
+                    f"Appointment with {student.user.get_full_name()} approved successfully. "
+                    f"Student’s program and topic have been updated."
+                )
 
         elif action in ['reject', 'decline']:
-            appointment.status = 'rejected' 
-            appointment.save()
-            messages.warning(
-                request,
-                f"Appointment with {appointment.student.user.get_full_name()} rejected."
-            )
+            if apply_transition(request, appointment, 'rejected'):
+                messages.warning(
+                    request,
+                    f"Appointment with {appointment.student.user.get_full_name()} rejected."
+                )
 
     next_url = request.GET.get('next') or request.META.get('HTTP_REFERER') or 'consultant_dashboard'
     return redirect(next_url)
 
 @login_required
+@conditional_page()
 def consultant_appointments_view(request):
     consultant_user = request.user
     try:
-        consultant = Consultant.objects.get(user=consultant_user)
+        consultant = get_role_profile(request, Consultant, required=True)
         appointments = Appointment.objects.filter(consultant=consultant).order_by('date', 'time')
     except Consultant.DoesNotExist:
         appointments = []
 
-    return render(request, 'ConsultApp/consultant-appointments.html', {'appointments': appointments})
+    return render(request, 'ConsultApp/consultant-appointments.html', {
+        'appointments': appointments,
+        'calendar_feed_url': get_calendar_feed_url(request, consultant_user),
+    })
 
 from django.utils import timezone
 
@@ -425,38 +678,35 @@ def consultant_history_view(request):
     consultant_user = request.user
     
     try:
-        consultant = Consultant.objects.get(user=consultant_user)
+        consultant = get_role_profile(request, Consultant, required=True)
     except Consultant.DoesNotExist:
         return render(request, "ConsultApp/error.html", {"message": "Consultant record not found."})
 
-    now = timezone.now().date()
-    current_time = timezone.now().time()
-    
-    active_appts = Appointment.objects.filter(consultant=consultant, status='confirmed')
-    
-    for appt in active_appts:
-        if appt.date < now or (appt.date == now and appt.time < current_time):
-            appt.status = 'completed'
-            appt.save()
-            student = appt.student
-            student.sessions_completed += 1
-            student.save()
+    past_appts = Appointment.objects.filter(past_appointments_q(), consultant=consultant, status='confirmed')
+
+    add_completed_appointments(bulk_transition(past_appts.values('id'), 'confirmed', 'completed'))
 
     appointments = Appointment.objects.filter(
         consultant=consultant,
         status__in=['completed', 'cancelled', 'disputed', 'pending_student_review', 'rejected']
-    ).select_related('student__user').order_by('-date', '-time')
+    ).select_related('student__user')
+    archived = ArchivedAppointment.objects.filter(consultant=consultant).select_related('student__user', 'feedback')
+
+    try:
+        appointments, archive_context = history_appointments(request, appointments, archived)
+    except InvalidQuery:
+        return redirect('consultant_history')
     
     for appt in appointments:
         appt.was_disputed = (appt.status == 'cancelled' and appt.student_dispute_remark)
 
-    context = {"appointments": appointments}
+    context = {"appointments": appointments, **archive_context}
     return render(request, "ConsultApp/consultant-history.html", context)
 
 @login_required
 def consultant_students_view(request):
     try:
-        consultant = Consultant.objects.get(user=request.user)
+        consultant = get_role_profile(request, Consultant, required=True)
         students = list(Student.objects.filter(
             student_appointments__consultant=consultant,
             student_appointments__status='confirmed' 
@@ -478,7 +728,7 @@ def consultant_students_view(request):
 @login_required
 def consultant_profile_view(request):
     user = request.user
-    profile, created = Consultant.objects.get_or_create(user=user)
+    profile = get_role_profile(request, Consultant, create=True)
     base_avatar_url = get_avatar_url(user.id)
     avatar_url = None
     if base_avatar_url:
@@ -646,7 +896,7 @@ def consultant_profile_view(request):
 @login_required
 def consultant_verification_view(request):
     consultant_user = request.user
-    consultant, created = Consultant.objects.get_or_create(user=consultant_user)
+    consultant = get_role_profile(request, Consultant, create=True)
 
     if consultant.is_verified:
         messages.info(request, "You are already a verified consultant!")
@@ -798,7 +1048,7 @@ def consultant_market(request):
         "Consultant Office"
     ]
     try:
-        consultant = Consultant.objects.get(user=request.user)
+        consultant = get_role_profile(request, Consultant, required=True)
     except Consultant.DoesNotExist:
         messages.error(request, "Consultant profile not found.")
         return redirect('consultant_dashboard')
@@ -954,7 +1204,7 @@ def consultant_market(request):
 @require_POST
 def toggle_market_status(request, market_id):
     try:
-        consultant = Consultant.objects.get(user=request.user)
+        consultant = get_role_profile(request, Consultant, required=True)
         market_listing = get_object_or_404(Market, id=market_id, consultant=consultant)
         
         market_listing.is_active = not market_listing.is_active
@@ -971,9 +1221,40 @@ def toggle_market_status(request, market_id):
     return redirect('consultant_dashboard')
 
 # 🔹 Student Views
+def build_student_dashboard_data(student):
+    pending_consultant_ids = set(Appointment.objects.filter(
+        student=student, 
+        status='pending'
+    ).values_list('consultant__user__id', flat=True))
+
+    upcoming_sessions = list(Appointment.objects.filter(
+        student=student, status__in=["confirmed", "pending"]
+    ).select_related('consultant__user').order_by("date")[:5])
+
+    pending_reviews = list(Appointment.objects.filter(
+        student=student,
+        status='pending_student_review'
+    ).select_related('consultant__user').order_by('date'))
+
+    archived = dict(archived_status_counts(student=student))
+    stats = {
+        "current": Appointment.objects.filter(student=student, status="confirmed").count(),
+        "previous": Appointment.objects.filter(student=student, status="completed").count() + archived.get("completed", 0),
+        "pending": Appointment.objects.filter(student=student, status="pending").count(),
+        "cancelled": Appointment.objects.filter(student=student, status="cancelled").count() + archived.get("cancelled", 0),
+    }
+
+    return {
+        "pending_consultant_ids": pending_consultant_ids,
+        "upcoming_sessions": upcoming_sessions,
+        "pending_reviews": pending_reviews,
+        "stats": stats,
+    }
+
 @login_required
+@conditional_page("market")
 def student_dashboard(request):
-    student = Student.objects.filter(user=request.user).first()
+    student = get_role_profile(request, Student)
 
     if not student:
         messages.error(request, "Student profile not found.")
@@ -987,23 +1268,14 @@ def student_dashboard(request):
     if base_avatar_url:
         avatar_url = f"{base_avatar_url}?t={timestamp}"
 
-    pending_consultant_ids = set(Appointment.objects.filter(
-        student=student, 
-        status='pending'
-    ).values_list('consultant__user__id', flat=True))
-
-    upcoming_sessions = Appointment.objects.filter(
-        student=student, status__in=["confirmed", "pending"]
-    ).order_by("date")[:5]
-
-    pending_reviews = Appointment.objects.filter(
-        student=student,
-        status='pending_student_review'
-    ).select_related('consultant__user').order_by('date')
+    data = get_dashboard_data(
+        "student", request.user.id,
+        lambda: build_student_dashboard_data(student),
+    )
 
     query = request.GET.get("q", "").strip()
 
-    consultants_qs = Market.objects.select_related("consultant__user").filter(
+    consultants_qs = Market.objects.select_related("consultant__user", "capacity").filter(
         consultant__is_verified=True,
         is_active=True,
     )
@@ -1014,11 +1286,13 @@ def student_dashboard(request):
             Q(consultant__user__last_name__icontains=query) |
             Q(consultant__expertise__icontains=query) |
             Q(profession__icontains=query)
-        )
+        ).order_by(*capacity_ordering())
     else:
         consultants_qs = consultants_qs.order_by("?")[:3]
 
-    recommended_consultants = list(consultants_qs)
+    recommended_consultants = with_capacity(list(consultants_qs))
+    if has_stale_capacity(recommended_consultants):
+        refresh_stale_capacity()
 
     for market in recommended_consultants:
         c_url = get_avatar_url(market.consultant.user.id)
@@ -1027,30 +1301,112 @@ def student_dashboard(request):
         else:
             market.consultant.avatar_url = None
 
-    stats = {
-        "current": Appointment.objects.filter(student=student, status="confirmed").count(),
-        "previous": Appointment.objects.filter(student=student, status="completed").count(),
-        "pending": Appointment.objects.filter(student=student, status="pending").count(),
-        "cancelled": Appointment.objects.filter(student=student, status="cancelled").count(),
-    }
-
     context = {
+        **data,
         "student_name": request.user.get_full_name(),
         "student": student,
         "recommended_consultants": recommended_consultants,
-        "upcoming_sessions": upcoming_sessions,
-        "pending_reviews": pending_reviews, 
-        "stats": stats,
+        "capacity_window_days": CAPACITY_WINDOW_DAYS,
+        "low_capacity_hours": LOW_CAPACITY_HOURS,
         "query": query,
         "avatar_url": avatar_url,
-        "pending_consultant_ids": pending_consultant_ids,
     }
 
     return render(request, "ConsultApp/student-dashboard.html", context)
 
+async def abuild_student_dashboard_data(student):
+    appointments = Appointment.objects.filter(student=student)
+
+    pending_consultant_ids, upcoming_sessions, pending_reviews, current, previous, pending, cancelled, archived = await asyncio.gather(
+        alist(appointments.filter(status='pending').values_list('consultant__user__id', flat=True)),
+        alist(appointments.filter(
+            status__in=["confirmed", "pending"]
+        ).select_related('consultant__user').order_by("date")[:5]),
+        alist(appointments.filter(
+            status='pending_student_review'
+        ).select_related('consultant__user').order_by('date')),
+        appointments.filter(status="confirmed").acount(),
+        appointments.filter(status="completed").acount(),
+        appointments.filter(status="pending").acount(),
+        appointments.filter(status="cancelled").acount(),
+        alist(archived_status_counts(student=student)),
+    )
+    archived = dict(archived)
+
+    return {
+        "pending_consultant_ids": set(pending_consultant_ids),
+        "upcoming_sessions": upcoming_sessions,
+        "pending_reviews": pending_reviews,
+        "stats": {
+            "current": current,
+            "previous": previous + archived.get("completed", 0),
+            "pending": pending,
+            "cancelled": cancelled + archived.get("cancelled", 0),
+        },
+    }
+
+@login_required
+async def student_dashboard_async(request):
+    user = await request.auser()
+    student = request.profile if isinstance(request.profile, Student) else None
+    if student is None:
+        student = await Student.objects.filter(user=user).afirst()
+
+    if not student:
+        messages.error(request, "Student profile not found.")
+        return redirect('login')
+
+    timestamp = await request.session.aget('avatar_version', int(datetime.now().timestamp()))
+    query = request.GET.get("q", "").strip()
+
+    consultants_qs = Market.objects.select_related("consultant__user", "capacity").filter(
+        consultant__is_verified=True,
+        is_active=True,
+    )
+
+    if query:
+        consultants_qs = consultants_qs.filter(
+            Q(consultant__user__first_name__icontains=query) |
+            Q(consultant__user__last_name__icontains=query) |
+            Q(consultant__expertise__icontains=query) |
+            Q(profession__icontains=query)
+        ).order_by(*capacity_ordering())
+    else:
+        consultants_qs = consultants_qs.order_by("?")[:3]
+
+    data, recommended_consultants = await asyncio.gather(
+        aget_dashboard_data(
+            "student", user.id,
+            lambda: abuild_student_dashboard_data(student),
+        ),
+        alist(consultants_qs),
+    )
+    with_capacity(recommended_consultants)
+    if has_stale_capacity(recommended_consultants):
+        await sync_to_async(refresh_stale_capacity)()
+
+    avatars = await aget_avatar_urls(
+        [user.id] + [market.consultant.user_id for market in recommended_consultants], timestamp
+    )
+    for market in recommended_consultants:
+        market.consultant.avatar_url = avatars[market.consultant.user_id]
+
+    context = {
+        **data,
+        "student_name": user.get_full_name(),
+        "student": student,
+        "recommended_consultants": recommended_consultants,
+        "capacity_window_days": CAPACITY_WINDOW_DAYS,
+        "low_capacity_hours": LOW_CAPACITY_HOURS,
+        "query": query,
+        "avatar_url": avatars[user.id],
+    }
+
+    return await sync_to_async(render)(request, "ConsultApp/student-dashboard.html", context)
+
 @login_required
 def student_profile_view(request):
-    student = Student.objects.get(user=request.user)
+    student = get_role_profile(request, Student, required=True)
     user = request.user
     base_avatar_url = get_avatar_url(user.id)
     avatar_url = None
@@ -1177,7 +1533,7 @@ def student_profile_view(request):
             student.student_department = department
             student.student_program = program
             student.student_year_level = year_level_int
-            student.save()
+            student.save(update_fields=["student_department", "student_program", "student_year_level"])
             if not upload_error_occurred:
                 messages.success(request, "Profile updated successfully!", extra_tags="success")
             else:
@@ -1198,43 +1554,39 @@ def student_profile_view(request):
 
 @login_required
 def student_history_view(request):
-    student = Student.objects.filter(user=request.user).first()
+    student = get_role_profile(request, Student)
     if not student:
         return render(request, "ConsultApp/error.html", {"message": "Student record not found."})
 
-    now = timezone.now().date()
-    current_time = timezone.now().time()
-    
-    potential_updates = Appointment.objects.filter(
-        student=student, 
-        status__in=["pending", "confirmed"]
-    )
+    complete_past_appointments(student)
 
-    for appt in potential_updates:
-        if appt.date < now or (appt.date == now and appt.time < current_time):
-            appt.status = "completed"
-            appt.save()
-            
-            student.sessions_completed += 1
-            student.save()
-
-    appointments = Appointment.objects.filter(
+    hot_appointments = Appointment.objects.filter(
         student=student,
         status__in=['completed', 'cancelled', 'disputed', 'rejected']
-    ).select_related('consultant__user', 'feedback').order_by('-date', '-time')
+    )
+    archived_appointments = ArchivedAppointment.objects.filter(student=student)
+
+    try:
+        appointments, archive_context = history_appointments(
+            request,
+            hot_appointments.select_related('consultant__user', 'feedback'),
+            archived_appointments.select_related('consultant__user', 'feedback'),
+        )
+    except InvalidQuery:
+        return redirect('student_history')
     
     for appt in appointments:
         appt.was_disputed = (appt.status == 'cancelled' and appt.student_dispute_remark)
 
-    consultants = Consultant.objects.select_related('user').all()
+    consultants = consultant_filter_choices(hot_appointments, archived_appointments)
 
-    context = {"appointments": appointments, "consultants": consultants}
+    context = {"appointments": appointments, "consultants": consultants, **archive_context}
     return render(request, "ConsultApp/student-history.html", context)
 
 @login_required
 def submit_feedback(request):
     if request.method == "POST":
-        student = Student.objects.filter(user=request.user).first()
+        student = get_role_profile(request, Student)
         if not student:
             messages.error(request, "Student profile not found.")
             return redirect('student_history')
@@ -1281,34 +1633,23 @@ def submit_feedback(request):
     return redirect('student_history')
 
 @login_required
+@conditional_page(prepare=complete_own_past_appointments)
 def student_appointments_view(request):
-    student = get_object_or_404(Student, user=request.user)
-
-    now = timezone.now().date()
-    current_time = timezone.now().time()
-    appointments = Appointment.objects.filter(student=student)
-
-    for appt in appointments:
-        if appt.status in ["pending", "confirmed"]:
-            if appt.date < now or (appt.date == now and appt.time < current_time):
-                appt.status = "completed"
-                appt.save()
-                
-                student.sessions_completed += 1
-                student.save()
+    student = get_role_profile_or_404(request, Student)
 
     active_appointments = Appointment.objects.filter(
         student=student,
         status__in=["pending", "confirmed", "pending_student_review", "disputed"]
     ).order_by('date', 'time')
 
-    consultants = Consultant.objects.all()
-
     return render(request, "ConsultApp/student-appointments.html", {
         "appointments": active_appointments,
-        "consultants": consultants
+        "consultants": consultant_filter_choices(active_appointments),
+        "calendar_feed_url": get_calendar_feed_url(request, request.user),
     })
 
+SERIES_MAX_WEEKS = 16
+
 @login_required
 def book_appointment(request, consultant_id=None):
     def get_market_for_consultant(consultant_obj):
@@ -1353,7 +1694,7 @@ def book_appointment(request, consultant_id=None):
             print(f"Error checking avatar for {person.user.id}: {e}")
             person.avatar_url = None
 
-    student = Student.objects.filter(user=request.user).first()
+    student = get_role_profile(request, Student)
     if not student:
         messages.error(request, "Student profile not found.")
         return redirect('student_dashboard')
@@ -1384,13 +1725,6 @@ def book_appointment(request, consultant_id=None):
         ).exists()
 
         if has_pending:
-            consultants_with_market = Consultant.objects.filter(
-                is_verified=True, market_listings__is_active=True
-            ).select_related("user").distinct()
-            
-            for c in consultants_with_market:
-                attach_avatar(c, timestamp)
-            
             slots = []
             if market:
                 slots = generate_hourly_slots(market.available_from, market.available_to)
@@ -1398,7 +1732,6 @@ def book_appointment(request, consultant_id=None):
             context = {
                 "consultant": consultant,
                 "market": market,
-                "consultants": consultants_with_market,
                 "slots": slots,
                 "today": timezone.localdate().isoformat(),
                 "tomorrow": (timezone.localdate() + timedelta(days=1)).isoformat(),
@@ -1408,14 +1741,6 @@ def book_appointment(request, consultant_id=None):
             }
             return render(request, "ConsultApp/book_appointment.html", context)
 
-    consultants_with_market = Consultant.objects.filter(
-        is_verified=True,
-        market_listings__is_active=True
-    ).select_related("user").distinct()
-
-    for c in consultants_with_market:
-        attach_avatar(c, timestamp)
-
     if request.method == "POST":
         if not consultant:
             messages.error(request, "⚠️ Please select a consultant.")
@@ -1424,6 +1749,7 @@ def book_appointment(request, consultant_id=None):
         date_str = request.POST.get("date", "").strip()
         start_time_str = request.POST.get("start_time", "").strip()
         duration_hours_str = request.POST.get("duration_hours", "1")
+        repeat_weeks_str = request.POST.get("repeat_weeks", "1")
         topic = request.POST.get("topic", "").strip()
         research_title = request.POST.get("research_title", "").strip()
 
@@ -1436,7 +1762,6 @@ def book_appointment(request, consultant_id=None):
             return {
                 "consultant": consultant,
                 "market": market,
-                "consultants": consultants_with_market,
                 "slots": slots,
                 "today": timezone.localdate().isoformat(),
                 "tomorrow": (timezone.localdate() + timedelta(days=1)).isoformat(),
@@ -1457,6 +1782,11 @@ def book_appointment(request, consultant_id=None):
         except ValueError:
             duration_hours = 1
 
+        try:
+            repeat_weeks = min(max(int(repeat_weeks_str), 1), SERIES_MAX_WEEKS)
+        except ValueError:
+            repeat_weeks = 1
+
         try:
             date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
             start_time_obj = datetime.strptime(start_time_str, "%H:%M").time()
@@ -1476,22 +1806,7 @@ def book_appointment(request, consultant_id=None):
                 messages.error(request, "⚠️ For same-day bookings, please select a future time.")
                 return render(request, "ConsultApp/book_appointment.html", get_error_context())
 
-        start_dt = datetime.combine(date_obj, start_time_obj)
-        end_dt = start_dt + timedelta(hours=duration_hours)
-        end_time_obj = end_dt.time()
-        student_conflicts = Appointment.objects.filter(
-            student=student,
-            date=date_obj,
-            status__in=['pending', 'confirmed']
-        )
-
-        for ap in student_conflicts:
-            ap_start = datetime.combine(date_obj, ap.time)
-            ap_end = ap_start + timedelta(minutes=ap.duration_minutes or 60)
-            
-            if (start_dt < ap_end) and (end_dt > ap_start):
-                messages.error(request, f"⚠️ You are already busy from {ap.time.strftime('%H:%M')} to {ap_end.strftime('%H:%M')}.")
-                return render(request, "ConsultApp/book_appointment.html", get_error_context())
+        end_time_obj = Appointment.compute_end_time(start_time_obj, duration_hours * 60)
 
         day_name = date_obj.strftime('%A').lower()
         available_days_list = market.get_available_days_list
@@ -1508,24 +1823,81 @@ def book_appointment(request, consultant_id=None):
             messages.error(request, f"⚠️ Selected time is outside available hours ({available_from.strftime('%I:%M %p')} - {available_to.strftime('%I:%M %p')}).")
             return render(request, "ConsultApp/book_appointment.html", get_error_context())
 
-        conflicts = []
-        existing_appts = Appointment.objects.filter(
-            consultant=consultant, 
-            date=date_obj,
-            status__in=['pending', 'confirmed']
-        )
-        for ap in existing_appts:
-            ap_start = datetime.combine(date_obj, ap.time)
-            ap_end = ap_start + timedelta(minutes=ap.duration_minutes or 60)
-            if (start_dt < ap_end) and (end_dt > ap_start):
-                conflicts.append(ap)
-        
-        if conflicts:
+        if repeat_weeks > 1:
+            # Weekly series: same weekday and hours, so the availability checks
+            # above hold for every occurrence. Conflicts for all dates come
+            # from one query; free dates are booked, taken ones reported.
+            dates = [date_obj + timedelta(weeks=week) for week in range(repeat_weeks)]
+            busy = {}
+            series = []
+            try:
+                with transaction.atomic():
+                    # A series is one booking request, so like a single booking
+                    # it needs no other pending request with this consultant.
+                    # Locking the student row makes a double submit wait for
+                    # the first series and then see it.
+                    Student.objects.select_for_update().only("pk").get(pk=student.pk)
+                    already_pending = Appointment.objects.filter(
+                        student=student, consultant=consultant, status="pending"
+                    ).exists()
+
+                    if not already_pending:
+                        clashes = Appointment.overlapping(dates, start_time_obj, end_time_obj).filter(
+                            Q(student=student) | Q(consultant=consultant)
+                        ).values_list("date", "student_id")
+                        for day, clash_student_id in clashes:
+                            if clash_student_id == student.pk:
+                                busy[day] = "you already have a session"
+                            else:
+                                busy.setdefault(day, "already booked")
+
+                        series = [
+                            Appointment(
+                                consultant=consultant,
+                                student=student,
+                                topic=topic,
+                                research_title=research_title,
+                                date=day,
+                                time=start_time_obj,
+                                duration_minutes=duration_hours * 60,
+                                status="pending",
+                            )
+                            for day in dates if day not in busy
+                        ]
+                        if series:
+                            create_appointments(series, actor=request.user)
+            except IntegrityError:
+                messages.error(request, "⚠️ One of these time slots was just booked. Please try again.")
+                return render(request, "ConsultApp/book_appointment.html", get_error_context())
+
+            if already_pending:
+                messages.error(request, f"⚠️ You already have a pending appointment with {consultant.user.get_full_name()}. Please wait for their response before booking another.")
+                return render(request, "ConsultApp/book_appointment.html", get_error_context())
+
+            skipped = ", ".join(f"{day.strftime('%b %d')} ({reason})" for day, reason in sorted(busy.items()))
+            if not series:
+                messages.error(request, f"⚠️ None of the weekly dates are free: {skipped}.")
+                return render(request, "ConsultApp/book_appointment.html", get_error_context())
+
+            messages.success(request, f"✅ Booked {len(series)} of {len(dates)} weekly sessions with {consultant.user.get_full_name()}.")
+            if busy:
+                messages.warning(request, f"⚠️ Skipped: {skipped}.")
+            return redirect('student_dashboard')
+
+        overlapping = Appointment.overlapping([date_obj], start_time_obj, end_time_obj)
+
+        student_conflict = overlapping.filter(student=student).values_list("time", "end_time").first()
+        if student_conflict:
+            busy_from, busy_to = student_conflict
+            messages.error(request, f"⚠️ You are already busy from {busy_from.strftime('%H:%M')} to {busy_to.strftime('%H:%M')}.")
+            return render(request, "ConsultApp/book_appointment.html", get_error_context())
+
+        if overlapping.filter(consultant=consultant).exists():
             messages.error(request, "⚠️ This time slot is already booked.")
             return render(request, "ConsultApp/book_appointment.html", get_error_context())
 
         try:
-            appointment = Appointment.objects.create(
+            appointment = Appointment(
                 consultant=consultant,
                 student=student,
                 topic=topic,
@@ -1535,12 +1907,19 @@ def book_appointment(request, consultant_id=None):
                 duration_minutes=duration_hours * 60,
                 status="pending",
             )
+            appointment.changed_by = request.user
+            appointment.save()
             consultant_name = consultant.user.get_full_name()
             messages.success(request, f"✅ Booking confirmed! Request sent to {consultant_name}.")
             return redirect('student_dashboard')
+
+        except IntegrityError:
+            # Lost a race for the slot; the PostgreSQL exclusion constraint caught it
+            messages.error(request, "⚠️ This time slot was just booked. Please choose another.")
+            return render(request, "ConsultApp/book_appointment.html", get_error_context())
             
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Booking an appointment failed")
             messages.error(request, "⚠️ Database error. Unable to book.")
             return render(request, "ConsultApp/book_appointment.html", get_error_context())
 
@@ -1553,10 +1932,13 @@ def book_appointment(request, consultant_id=None):
         slots = generate_hourly_slots(market.available_from, market.available_to)
         unavailable_dates = get_unavailable_dates(market)
 
+    # The picker itself loads its options from api_consultants when opened
+    has_consultants = consultant is not None or bookable_consultants().exists()
+
     return render(request, "ConsultApp/book_appointment.html", {
         "consultant": consultant,
         "market": market,
-        "consultants": consultants_with_market,
+        "has_consultants": has_consultants,
         "slots": slots,
         "today": today.isoformat(),
         "tomorrow": tomorrow.isoformat(),
@@ -1565,20 +1947,18 @@ def book_appointment(request, consultant_id=None):
 
 @login_required
 def cancel_appointment(request, appointment_id):
-    student = get_object_or_404(Student, user=request.user)
+    student = get_role_profile_or_404(request, Student)
     booking = get_object_or_404(Appointment, id=appointment_id, student=student)
 
-    if booking.status != "pending":
+    if booking.status != "pending" or not transition(booking, "cancelled", actor=request.user):
         messages.error(request, "You can no longer cancel this appointment.")
         return redirect('student_appointments')
 
-    booking.status = "cancelled"
-    booking.save()
-
     messages.success(request, "Your appointment has been cancelled.")
     return redirect('student_appointments')
 
 @login_required
+@replica_reads
 def consultant_details(request, consultant_user_id):
     try:
         consultant = Consultant.objects.get(user__id=consultant_user_id)
@@ -1615,8 +1995,27 @@ def consultant_details(request, consultant_user_id):
 def is_admin(user):
     return user.is_superuser or getattr(user, "user_type", "") == "Admin"
 
+DASHBOARD_DISPUTE_PREVIEW = 5
+DISPUTE_QUEUE_ORDERING = ("disputed_at", "id")
+DISPUTE_QUEUE_PAGE_SIZE = 10
+
+def dispute_age_bucket_counts():
+    now = timezone.now()
+    day_ago = now - timedelta(days=1)
+    three_days_ago = now - timedelta(days=3)
+    return {
+        "total": Count("id"),
+        "under_24h": Count("id", filter=Q(disputed_at__gte=day_ago)),
+        "one_to_three_days": Count("id", filter=Q(disputed_at__lt=day_ago, disputed_at__gte=three_days_ago)),
+        "older": Count("id", filter=Q(disputed_at__lt=three_days_ago)),
+    }
+
+def get_dispute_age_buckets():
+    return Appointment.objects.filter(status='disputed').aggregate(**dispute_age_bucket_counts())
+
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def admin_dashboard(request):
     total_students = Student.objects.count()
     total_consultants = Consultant.objects.count()
@@ -1626,7 +2025,8 @@ def admin_dashboard(request):
     verification_requests = Verification.objects.filter(status='pending').select_related('consultant')
     disputed_appointments = Appointment.objects.filter(
         status='disputed'
-    ).select_related('student__user', 'consultant__user').order_by('-disputed_at')
+    ).select_related('student__user', 'consultant__user').order_by('-disputed_at', '-id')[:DASHBOARD_DISPUTE_PREVIEW]
+    dispute_age_buckets = get_dispute_age_buckets()
 
     return render(request, "ConsultApp/admin-dashboard.html", {
         "total_students": total_students,
@@ -1636,16 +2036,56 @@ def admin_dashboard(request):
         "recent_users": recent_users,
         "verification_requests": verification_requests,
         "disputed_appointments": disputed_appointments,  
+        "dispute_age_buckets": dispute_age_buckets,
+    })
+
+@login_required
+@user_passes_test(is_admin)
+@replica_reads
+async def admin_dashboard_async(request):
+    (
+        total_students,
+        total_consultants,
+        pending_approvals,
+        active_bookings,
+        recent_users,
+        verification_requests,
+        disputed_appointments,
+        dispute_age_buckets,
+    ) = await asyncio.gather(
+        Student.objects.acount(),
+        Consultant.objects.acount(),
+        Verification.objects.filter(status='pending').acount(),
+        Appointment.objects.acount(),
+        alist(User.objects.order_by('-date_joined')[:5]),
+        alist(Verification.objects.filter(status='pending').select_related('consultant')),
+        alist(Appointment.objects.filter(
+            status='disputed'
+        ).select_related('student__user', 'consultant__user').order_by('-disputed_at', '-id')[:DASHBOARD_DISPUTE_PREVIEW]),
+        Appointment.objects.filter(status='disputed').aaggregate(**dispute_age_bucket_counts()),
+    )
+
+    return await sync_to_async(render)(request, "ConsultApp/admin-dashboard.html", {
+        "total_students": total_students,
+        "total_consultants": total_consultants,
+        "pending_approvals": pending_approvals,
+        "active_bookings": active_bookings,
+        "recent_users": recent_users,
+        "verification_requests": verification_requests,
+        "disputed_appointments": disputed_appointments,
+        "dispute_age_buckets": dispute_age_buckets,
     })
 
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def admin_students_view(request):
     students = Student.objects.select_related('user').all()
     return render(request, "ConsultApp/admin-students.html", {"students": students})
 
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def admin_consultants_view(request):
     consultants = Consultant.objects.select_related('user').annotate(
         has_pending_verification=Case(
@@ -1676,14 +2116,46 @@ def admin_consultants_view(request):
 
 @login_required
 @user_passes_test(is_admin)
+@replica_reads
 def admin_reports_view(request):
     return render(request, "ConsultApp/admin-reports.html")
 
+@login_required
+@user_passes_test(is_admin)
+def admin_dispute_queue(request):
+    cursor = request.GET.get("cursor", "")
+    disputes_qs = Appointment.objects.filter(
+        status='disputed'
+    ).select_related('student__user', 'consultant__user')
+
+    try:
+        disputes, next_cursor = paginate_queryset(
+            disputes_qs, DISPUTE_QUEUE_ORDERING, cursor, DISPUTE_QUEUE_PAGE_SIZE
+        )
+    except InvalidQuery:
+        return redirect('admin_dispute_queue')
+
+    return render(request, "ConsultApp/admin-disputes.html", {
+        "disputes": disputes,
+        "cursor": cursor,
+        "next_cursor": next_cursor,
+        "age_buckets": get_dispute_age_buckets(),
+    })
+
+@login_required
+@user_passes_test(is_admin)
+def admin_metrics_view(request):
+    return JsonResponse({
+        "dashboard_cache": dashboard_cache_stats(),
+        "database_pool": database_pool_stats(),
+        "session_counter_drift": session_counter_drift(),
+    })
+
 @login_required
 @user_passes_test(is_admin)
 def admin_profile_view(request):
     admin_user = request.user
-    admin_profile, _ = Admin.objects.get_or_create(user=admin_user)
+    admin_profile = get_role_profile(request, Admin, create=True)
     avatar_path = f"{admin_user.id}/profile.png"
     avatar_url = None
 
@@ -1820,19 +2292,7 @@ def admin_profile_view(request):
 @login_required
 @user_passes_test(is_admin)
 def sync_sessions_completed(request):
-    students = Student.objects.all()
-    updated_count = 0
-    
-    for student in students:
-        actual_completed = Appointment.objects.filter(
-            student=student,
-            status='completed'
-        ).count()
-        
-        if student.sessions_completed != actual_completed:
-            student.sessions_completed = actual_completed
-            student.save()
-            updated_count += 1
+    updated_count = resync_sessions_completed()
     
     messages.success(
         request, 
@@ -1893,11 +2353,117 @@ def reject_consultant(request, verification_id):
     messages.info(request, f"{verification.consultant.get_full_name()}'s verification was rejected.")
     return redirect('admin_dashboard')
 
+# 🔹 Bulk Review (many verifications in one request)
+def get_bulk_review_input(request):
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            data = {}
+        return data.get("action"), data.get("verification_ids") or []
+    return request.POST.get("action"), request.POST.getlist("verification_ids")
+
+@require_POST
+@login_required
+@user_passes_test(is_admin)
+def bulk_review_verifications(request):
+    action, raw_ids = get_bulk_review_input(request)
+    wants_json = "application/json" in request.headers.get("Accept", "")
+
+    try:
+        verification_ids = {int(value) for value in raw_ids}
+    except (TypeError, ValueError):
+        verification_ids = None
+
+    if action not in ("approve", "reject") or not verification_ids:
+        error = "Choose approve or reject and at least one verification."
+        if wants_json:
+            return JsonResponse({"error": error}, status=400)
+        messages.error(request, error)
+        return redirect('admin_dashboard')
+
+    reviewed_at = timezone.now()
+    missing_profiles = []
+
+    with transaction.atomic():
+        # Only pending requests are reviewed, and the row locks stop two admins
+        # from processing the same request at once
+        verifications = list(
+            Verification.objects.select_for_update(of=("self",))
+            .select_related("consultant__consultant")
+            .filter(id__in=verification_ids, status='pending')
+        )
+
+        if action == "approve":
+            consultants = []
+            for verification in verifications:
+                try:
+                    consultant = verification.consultant.consultant
+                except Consultant.DoesNotExist:
+                    missing_profiles.append(verification.id)
+                    continue
+                if verification.contact_number:
+                    consultant.contact_number = verification.contact_number
+                if verification.expertise:
+                    consultant.expertise = verification.expertise
+                if verification.workplace:
+                    consultant.workplace = verification.workplace
+                consultant.is_verified = True
+                consultants.append(consultant)
+
+            Consultant.objects.bulk_update(
+                consultants, ["contact_number", "expertise", "workplace", "is_verified"]
+            )
+
+        reviewed = [v for v in verifications if v.id not in missing_profiles]
+        Verification.objects.filter(id__in=[v.id for v in reviewed]).update(
+            status='approved' if action == "approve" else 'rejected',
+            reviewed_at=reviewed_at,
+        )
+
+    # bulk_update() and update() don't send post_save, so do what the
+    # signal receivers would have done
+    user_ids = [v.consultant_id for v in reviewed]
+    if user_ids:
+        invalidate_dashboards(*user_ids)
+        touch_user_watermarks(*user_ids)
+        if action == "approve":
+            invalidate_profile(*user_ids)
+            # Newly verified consultants' listings join the marketplace
+            touch_watermarks("market")
+            invalidate_typeahead()
+
+    reviewed_ids = {v.id for v in reviewed}
+    summary = {
+        "action": action,
+        "requested": len(verification_ids),
+        "reviewed": len(reviewed),
+        "reviewed_ids": sorted(reviewed_ids),
+        "skipped_ids": sorted(verification_ids - reviewed_ids - set(missing_profiles)),
+        "missing_profile_ids": sorted(missing_profiles),
+    }
+    if wants_json:
+        return JsonResponse(summary)
+
+    verb = "approved" if action == "approve" else "rejected"
+    messages.success(request, f"{summary['reviewed']} verification request(s) {verb}.")
+    if summary["skipped_ids"]:
+        messages.info(request, f"{len(summary['skipped_ids'])} request(s) were skipped because they are no longer pending.")
+    if missing_profiles:
+        messages.error(request, f"{len(missing_profiles)} request(s) have no consultant profile and were left pending.")
+    return redirect('admin_dashboard')
+
 # 🔹 Password Views
 @csrf_exempt
 def forgot_password_view(request):
     if request.method == "POST":
         email = request.POST.get("email")
+
+        retry_after = check_rate_limit(request, "forgot_password", account=email)
+        if retry_after:
+            messages.error(request, f"Too many reset requests. Please try again in {format_retry_after(retry_after)}.")
+            return rate_limited(render(request, "ConsultApp/forgot-password.html", status=429), retry_after)
+
         user = User.objects.filter(email=email).first()
 
         if not user:
@@ -1951,15 +2517,330 @@ def reset_password_view(request, uidb64, token):
         messages.error(request, "The password reset link is invalid or has expired.")
         return redirect("forgot_password")
 
+# 🔹 Appointment Events (Server-Sent Events, ASGI only)
+@login_required
+async def appointment_events(request):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be held by the stream for as long as the tab is open
+        return HttpResponse("Live updates require an ASGI server.", status=501)
+
+    user = await request.auser()
+
+    async def stream():
+        queue = subscribe(user.pk)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.APPOINTMENT_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                data = {key: value for key, value in event.items() if key != "user_ids"}
+                yield f"event: appointment\ndata: {json.dumps(data)}\n\n"
+        finally:
+            unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+# 🔹 Calendar Feed
+CALENDAR_FEED_STATUSES = ['pending', 'confirmed']
+# Tokens sign "<user id>:<calendar_feed_version>", so a leaked link stops
+# working once its owner resets it
+calendar_feed_signer = signing.Signer(salt='ConsultApp.calendar_feed.versioned')
+
+def get_calendar_feed_url(request, user):
+    token = calendar_feed_signer.sign(f"{user.pk}:{user.calendar_feed_version}")
+    return request.build_absolute_uri(reverse('calendar_feed', args=[token]))
+
+def get_calendar_feed_user_id(token):
+    try:
+        user_id, version = map(int, calendar_feed_signer.unsign(token).split(":"))
+    except (signing.BadSignature, ValueError):
+        return None
+    if not User.objects.filter(pk=user_id, calendar_feed_version=version, is_active=True).exists():
+        return None
+    return user_id
+
+@login_required
+@require_POST
+def reset_calendar_feed(request):
+    User.objects.filter(pk=request.user.pk).update(calendar_feed_version=F('calendar_feed_version') + 1)
+    # update() sends no post_save; the appointments pages show the link
+    touch_user_watermarks(request.user.pk)
+    messages.success(request, "✅ Your calendar link was reset. Subscribe again with the new link.")
+    return redirect('consultant_appointments' if request.user.role == 'consultant' else 'student_appointments')
+
+def calendar_feed_appointments(user_id):
+    # Student and Consultant share their user's primary key, so one filter
+    # covers both roles without looking the user up.
+    return Appointment.objects.filter(Q(student_id=user_id) | Q(consultant_id=user_id))
+
+def get_calendar_feed_state(request, token):
+    # One lookup of the token's user and one aggregate answer both ETag and
+    # Last-Modified for conditional requests
+    if not hasattr(request, '_calendar_feed_state'):
+        user_id = get_calendar_feed_user_id(token)
+        state = None
+        if user_id is not None:
+            state = calendar_feed_appointments(user_id).aggregate(
+                last_updated=Max('updated_at'),
+                feed_count=Count('id', filter=Q(status__in=CALENDAR_FEED_STATUSES)),
+            )
+            state['user_id'] = user_id
+        request._calendar_feed_state = state
+    return request._calendar_feed_state
+
+def calendar_feed_etag(request, token):
+    state = get_calendar_feed_state(request, token)
+    if state is None:
+        return None
+    last_updated = state['last_updated'].timestamp() if state['last_updated'] else 0
+    return f"{state['user_id']}-{last_updated}-{state['feed_count']}"
+
+def calendar_feed_last_modified(request, token):
+    state = get_calendar_feed_state(request, token)
+    return state['last_updated'] if state else None
+
+def ics_escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\n', '\\n')
+    )
+
+def ics_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+@condition(etag_func=calendar_feed_etag, last_modified_func=calendar_feed_last_modified)
+def calendar_feed(request, token):
+    state = get_calendar_feed_state(request, token)
+    if state is None:
+        raise Http404("Calendar feed not found.")
+    user_id = state['user_id']
+
+    appointments = calendar_feed_appointments(user_id).filter(
+        status__in=CALENDAR_FEED_STATUSES
+    ).select_related('student__user', 'consultant__user').order_by('date', 'time')
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//ResearchMate//Appointments//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:ResearchMate Appointments",
+    ]
+    for appt in appointments:
+        start = timezone.make_aware(datetime.combine(appt.date, appt.time))
+        end = start + timedelta(minutes=appt.duration_minutes or 60)
+        if appt.student_id == user_id:
+            with_name = appt.consultant.user.get_full_name()
+        else:
+            with_name = appt.student.user.get_full_name()
+        description = appt.research_title or appt.topic
+
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:appointment-{appt.id}@researchmate",
+            f"DTSTAMP:{ics_datetime(appt.updated_at)}",
+            f"LAST-MODIFIED:{ics_datetime(appt.updated_at)}",
+            f"DTSTART:{ics_datetime(start)}",
+            f"DTEND:{ics_datetime(end)}",
+            f"SUMMARY:{ics_escape(f'{appt.topic} with {with_name}')}",
+            f"DESCRIPTION:{ics_escape(description)}",
+            f"STATUS:{'CONFIRMED' if appt.status == 'confirmed' else 'TENTATIVE'}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+
+    response = HttpResponse("\r\n".join(lines) + "\r\n", content_type="text/calendar; charset=utf-8")
+    response["Content-Disposition"] = 'inline; filename="researchmate.ics"'
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+# 🔹 JSON API (read-only, cursor paginated)
+def full_name(prefix):
+    return Concat(f"{prefix}__first_name", Value(" "), f"{prefix}__last_name", output_field=CharField())
+
+API_APPOINTMENT_FIELDS = {
+    "id": "id",
+    "topic": "topic",
+    "research_title": "research_title",
+    "date": "date",
+    "time": "time",
+    "duration_minutes": "duration_minutes",
+    "status": "status",
+    "consultant_marked_as": "consultant_marked_as",
+    "student_id": "student_id",
+    "student_name": full_name("student__user"),
+    "consultant_id": "consultant_id",
+    "consultant_name": full_name("consultant__user"),
+    "updated_at": "updated_at",
+}
+
+API_MARKET_FIELDS = {
+    "id": "id",
+    "consultant_id": "consultant_id",
+    "consultant_name": full_name("consultant__user"),
+    "expertise": "consultant__expertise",
+    "profession": "profession",
+    "available_from": "available_from",
+    "available_to": "available_to",
+    "available_days": "available_days",
+    "rate_per_hour": "rate_per_hour",
+    "meeting_place": "meeting_place",
+    "description": "description",
+}
+
+API_CONSULTANT_FIELDS = {
+    "id": "user_id",
+    "name": full_name("user"),
+    "expertise": "expertise",
+    "workplace": "workplace",
+}
+
+API_FEEDBACK_FIELDS = {
+    "id": "id",
+    # Archived appointments keep their ids
+    "appointment_id": Coalesce("appointment_id", "archived_appointment_id"),
+    "rating": "rating",
+    "comment": "comment",
+    "created_at": "created_at",
+    "student_id": "student_id",
+    "student_name": full_name("student__user"),
+    "consultant_id": "consultant_id",
+    "consultant_name": full_name("consultant__user"),
+}
+
+API_TRANSITION_FIELDS = {
+    "id": "id",
+    "appointment_id": "appointment_number",
+    "from_status": "from_status",
+    "to_status": "to_status",
+    "actor_id": "actor_id",
+    "created_at": "created_at",
+}
+
+def api_page(request, queryset, ordering, fields):
+    try:
+        return JsonResponse(paginate_values(queryset, ordering, fields, request.GET))
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@login_required
+def api_appointments(request):
+    appointments = Appointment.objects.filter(
+        Q(student_id=request.user.id) | Q(consultant_id=request.user.id)
+    )
+    status = request.GET.get("status")
+    if status:
+        appointments = appointments.filter(status__in=status.split(","))
+    return api_page(request, appointments, ("date", "time", "id"), API_APPOINTMENT_FIELDS)
+
+@login_required
+def api_appointment_transitions(request):
+    transitions = AppointmentTransition.objects.filter(
+        Q(appointment__student_id=request.user.id) | Q(appointment__consultant_id=request.user.id)
+    )
+    # ?since=<last id seen> reads only what was appended after it
+    since = request.GET.get("since")
+    if since:
+        if not since.isdigit():
+            return JsonResponse({"error": "since must be a transition id."}, status=400)
+        transitions = transitions.filter(id__gt=int(since))
+    return api_page(request, transitions, ("id",), API_TRANSITION_FIELDS)
+
+@login_required
+def api_market(request):
+    listings = Market.objects.filter(consultant__is_verified=True, is_active=True)
+    query = request.GET.get("q", "").strip()
+    if query:
+        listings = listings.filter(
+            Q(consultant__user__first_name__icontains=query) |
+            Q(consultant__user__last_name__icontains=query) |
+            Q(consultant__expertise__icontains=query) |
+            Q(profession__icontains=query)
+        )
+    return api_page(request, listings, ("id",), API_MARKET_FIELDS)
+
+@login_required
+def api_market_typeahead(request):
+    # ?q=data ana: listings with a consultant name, profession or expertise
+    # word starting with every word of q, served from the in-memory index
+    limit = request.GET.get("limit", str(TYPEAHEAD_LIMIT))
+    if not limit.isdigit() or not 1 <= int(limit) <= TYPEAHEAD_MAX_LIMIT:
+        return JsonResponse({"error": f"limit must be between 1 and {TYPEAHEAD_MAX_LIMIT}."}, status=400)
+    return JsonResponse({"results": search_listings(request.GET.get("q", ""), int(limit))})
+
+def bookable_consultants():
+    # Verified consultants with at least one active listing
+    return Consultant.objects.filter(
+        Exists(Market.objects.filter(consultant=OuterRef("pk"), is_active=True)),
+        is_verified=True,
+    )
+
+@login_required
+def api_consultants(request):
+    # Typeahead for consultant pickers: verified consultants whose first or
+    # last name starts with ?q=, a page at a time. ?bookable=1 keeps only
+    # those with an active listing.
+    if request.GET.get("bookable") == "1":
+        consultants = bookable_consultants()
+    else:
+        consultants = Consultant.objects.filter(is_verified=True)
+    query = request.GET.get("q", "").strip()
+    if query:
+        consultants = consultants.filter(
+            Q(user__first_name__istartswith=query) | Q(user__last_name__istartswith=query)
+        )
+    return api_page(request, consultants, ("user__first_name", "user__last_name", "user_id"), API_CONSULTANT_FIELDS)
+
+@login_required
+def api_feedback(request):
+    feedback = Feedback.objects.filter(
+        Q(student_id=request.user.id) | Q(consultant_id=request.user.id)
+    )
+    return api_page(request, feedback, ("-created_at", "-id"), API_FEEDBACK_FIELDS)
+
+@login_required
+def api_available_slots(request):
+    # ?expertise=Data+Analysis&from=2025-01-06&to=2025-01-10&duration=1 (hours)
+    today = timezone.localdate()
+    try:
+        date_from = max(datetime.strptime(request.GET["from"], "%Y-%m-%d").date(), today) if request.GET.get("from") else today
+        date_to = datetime.strptime(request.GET["to"], "%Y-%m-%d").date() if request.GET.get("to") else date_from + timedelta(days=6)
+        duration_hours = int(request.GET.get("duration", "1"))
+    except ValueError:
+        return JsonResponse({"error": "Use YYYY-MM-DD dates and a whole number of hours."}, status=400)
+
+    if date_to < date_from or (date_to - date_from).days >= MAX_WINDOW_DAYS:
+        return JsonResponse({"error": f"The date window must be 1 to {MAX_WINDOW_DAYS} days."}, status=400)
+    if not 1 <= duration_hours <= 3:
+        return JsonResponse({"error": "duration must be between 1 and 3 hours."}, status=400)
+
+    slots = find_common_slots(request.GET.get("expertise", "").strip(), date_from, date_to, duration_hours * 60)
+    for slot in slots:
+        slot["book_url"] = reverse("book_appointment_with_consultant", args=[slot["consultant_id"]])
+    return JsonResponse({"results": slots})
+
 # 🔹 Appointment Views
 @login_required
 def all_consultants_view(request):
-    consultants = (
+    consultants = with_capacity(list(
         Market.objects
-        .select_related("consultant__user")
+        .select_related("consultant__user", "capacity")
         .filter(consultant__is_verified=True, is_active=True)
-    )
-    return render(request, "ConsultApp/all-consultants.html", {"consultants": consultants})
+        .order_by(*capacity_ordering())
+    ))
+    if has_stale_capacity(consultants):
+        refresh_stale_capacity()
+    return render(request, "ConsultApp/all-consultants.html", {
+        "consultants": consultants,
+        "capacity_window_days": CAPACITY_WINDOW_DAYS,
+        "low_capacity_hours": LOW_CAPACITY_HOURS,
+    })
 
 @login_required
 @user_passes_test(is_admin)
@@ -2036,7 +2917,7 @@ def consultant_profile_admin_view(request, consultant_id):
 @login_required
 @require_POST
 def mark_meeting_status(request, appointment_id):
-    consultant = get_object_or_404(Consultant, user=request.user)
+    consultant = get_role_profile_or_404(request, Consultant)
     appointment = get_object_or_404(
         Appointment, 
         id=appointment_id, 
@@ -2047,15 +2928,11 @@ def mark_meeting_status(request, appointment_id):
     action = request.POST.get('action')
     
     if action == 'completed':
-        appointment.consultant_marked_as = 'completed'
-        appointment.status = 'pending_student_review'
-        appointment.save()
-        messages.success(request, "✅ Meeting marked as completed. Awaiting student confirmation.")
+        if apply_transition(request, appointment, 'pending_student_review', consultant_marked_as='completed'):
+            messages.success(request, "✅ Meeting marked as completed. Awaiting student confirmation.")
     elif action == 'not_completed':
-        appointment.consultant_marked_as = 'not_completed'
-        appointment.status = 'pending_student_review'
-        appointment.save()
-        messages.info(request, "Meeting marked as not completed. Student will be notified.")
+        if apply_transition(request, appointment, 'pending_student_review', consultant_marked_as='not_completed'):
+            messages.info(request, "Meeting marked as not completed. Student will be notified.")
     else:
         messages.error(request, "Invalid action.")
     
@@ -2065,7 +2942,7 @@ def mark_meeting_status(request, appointment_id):
 @login_required
 @require_POST
 def student_confirm_or_dispute(request, appointment_id):
-    student = get_object_or_404(Student, user=request.user)
+    student = get_role_profile_or_404(request, Student)
     appointment = get_object_or_404(
         Appointment,
         id=appointment_id,
@@ -2077,14 +2954,11 @@ def student_confirm_or_dispute(request, appointment_id):
     
     if action == 'confirm':
         if appointment.consultant_marked_as == 'completed':
-            appointment.status = 'completed'
-            student.sessions_completed += 1
-            student.save()
-            messages.success(request, "✅ Meeting confirmed as completed!")
-        else:
-            appointment.status = 'cancelled'
+            if apply_transition(request, appointment, 'completed'):
+                add_completed_sessions(student.pk)
+                messages.success(request, "✅ Meeting confirmed as completed!")
+        elif apply_transition(request, appointment, 'cancelled'):
             messages.info(request, "Meeting confirmed as not completed.")
-        appointment.save()
         
     elif action == 'dispute':
         remark = request.POST.get('dispute_remark', '').strip()
@@ -2097,15 +2971,11 @@ def student_confirm_or_dispute(request, appointment_id):
             messages.error(request, "Please provide a more detailed explanation (at least 10 characters).")
             return redirect('student_appointments')
         
-        appointment.student_dispute_remark = remark
-        appointment.status = 'disputed'
-        appointment.disputed_at = timezone.now()
-        appointment.save()
-        
-        messages.warning(
-            request, 
-            "⚠️ Dispute submitted. An administrator will review this case."
-        )
+        if apply_transition(request, appointment, 'disputed', student_dispute_remark=remark, disputed_at=timezone.now()):
+            messages.warning(
+                request, 
+                "⚠️ Dispute submitted. An administrator will review this case."
+            )
     else:
         messages.error(request, "Invalid action.")
     
@@ -2121,45 +2991,24 @@ def admin_resolve_dispute(request, appointment_id):
     decision = request.POST.get('decision')
     
     if decision == 'mark_completed':
-        appointment.status = 'completed'
-        student = appointment.student
-        student.sessions_completed += 1
-        student.save()
-        messages.success(request, "✅ Dispute resolved: Meeting marked as completed.")
+        if apply_transition(request, appointment, 'completed'):
+            add_completed_sessions(appointment.student_id)
+            messages.success(request, "✅ Dispute resolved: Meeting marked as completed.")
         
     elif decision == 'mark_not_completed':
-        appointment.status = 'cancelled'
-        messages.success(request, "Dispute resolved: Meeting marked as not completed.")
+        if apply_transition(request, appointment, 'cancelled'):
+            messages.success(request, "Dispute resolved: Meeting marked as not completed.")
         
     else:
         messages.error(request, "Invalid decision.")
         return redirect('admin_dashboard')
-    
-    appointment.save()
-    return redirect('admin_dashboard')
 
-@login_required
-@user_passes_test(is_admin)
-@require_POST
-def admin_resolve_dispute(request, appointment_id):
-    appointment = get_object_or_404(Appointment, id=appointment_id, status='disputed')
-    
-    decision = request.POST.get('decision')
-    
-    if decision == 'mark_completed':
-        appointment.status = 'completed'
-        student = appointment.student
-        student.sessions_completed += 1
-        student.save()
-        messages.success(request, "✅ Dispute resolved: Meeting marked as completed.")
-        
-    elif decision == 'mark_not_completed':
-        appointment.status = 'cancelled'
-        messages.success(request, "Dispute resolved: Meeting marked as not completed.")
-        
-    else:
-        messages.error(request, "Invalid decision.")
-        return redirect('admin_dashboard')
-    
-    appointment.save()
+    if request.POST.get('return_to') == 'queue':
+        # Resolve-and-next: same queue page, the resolved dispute drops out
+        # and the next one moves up
+        url = reverse('admin_dispute_queue')
+        cursor = request.POST.get('cursor')
+        if cursor:
+            url += f"?{urlencode({'cursor': cursor})}"
+        return redirect(url)
     return redirect('admin_dashboard')
\ No newline at end of file
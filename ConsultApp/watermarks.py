@@ -0,0 +1,85 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+# "Last changed" watermarks for conditional GETs.
+# A scope is either "user:<id>" (anything shown on that user's pages) or a
+# global scope such as "market". Writes replace the watermark with a new
+# timestamp, so an evicted entry can never make an old ETag match again.
+
+
+def _watermark_key(scope):
+    return f"watermark:{scope}"
+
+
+def touch_watermarks(*scopes):
+    now = time.time_ns()
+    cache.set_many({_watermark_key(scope): now for scope in scopes}, timeout=None)
+
+
+def touch_user_watermarks(*user_ids):
+    touch_watermarks(*{f"user:{user_id}" for user_id in user_ids if user_id})
+
+
+def get_watermarks(*scopes):
+    keys = [_watermark_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def user_page_etag(request, *scopes):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    # Flash messages are rendered once; never answer 304 while one is queued
+    if len(get_messages(request)):
+        return None
+
+    parts = [
+        request.path,
+        user.pk,
+        request.GET.urlencode(),
+        request.session.get('avatar_version'),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+        # Pages also show time-relative data (upcoming sessions, free slots
+        # today) that no write bumps, so an ETag only holds within the hour
+        timezone.localtime().strftime("%Y-%m-%d %H"),
+        *get_watermarks(f"user:{user.pk}", *scopes),
+    ]
+    return hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def conditional_page(*scopes, prepare=None):
+    # Answers If-None-Match with 304 from the watermarks alone, before the
+    # view runs any queries, and makes browsers revalidate on every load.
+    # prepare(request) runs first, for writes the page depends on (such as
+    # completing past appointments) that must bump the watermarks before
+    # they are compared.
+    def etag_func(request, *args, **kwargs):
+        return user_page_etag(request, *scopes)
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if prepare is not None:
+                prepare(request)
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return _wrapped_view
+    return decorator
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import urlparse
@@ -53,6 +54,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'ConsultApp.db_router.ReplicaPinMiddleware',
+    'ConsultApp.middleware.RoleProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,6 +72,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'ConsultApp.context_processors.appointment_events',
             ],
         },
     },
@@ -80,14 +84,140 @@ WSGI_APPLICATION = 'ResearchMate.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# PostgreSQL is reached through psycopg 3 (requirements.txt no longer ships
+# psycopg2), pooled or not.
+# DATABASE_POOL=true switches from one persistent connection per worker to
+# psycopg 3's connection pool. Pooled connections are health-checked before
+# being handed out, and persistent connections must be off while pooling.
+DATABASE_POOL = os.environ.get("DATABASE_POOL", "False").lower() == "true"
+
+def ssl_required(url):
+    # SQLite files (e.g. for trying replica routing locally) take no SSL options
+    return not (url or "").startswith("sqlite")
+
+
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=500,
-        ssl_require=True,
+        conn_max_age=0 if DATABASE_POOL else 500,
+        ssl_require=ssl_required(os.environ.get('DATABASE_URL')),
     )
 }
-    
+
+# DATABASE_REPLICA_URL adds a read replica. Only views decorated with
+# @replica_reads read from it, and not for DATABASE_REPLICA_STICKY_SECONDS
+# after the same browser wrote something. The replica is never migrated; with
+# SQLite, copy the migrated primary file to try it out.
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", "15"))
+
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=0 if DATABASE_POOL else 500,
+        ssl_require=ssl_required(DATABASE_REPLICA_URL),
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['ConsultApp.db_router.ReplicaRouter']
+
+if DATABASE_POOL:
+    from psycopg_pool import ConnectionPool
+
+    for database in DATABASES.values():
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+            'timeout': float(os.environ.get("DATABASE_POOL_TIMEOUT", "10")),
+            'max_idle': float(os.environ.get("DATABASE_POOL_MAX_IDLE", "300")),
+            'check': ConnectionPool.check_connection,
+        }
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# DJANGO_CACHE_BACKEND picks the default cache:
+#   "locmem" per process (the default)
+#   "redis"  Redis server at DJANGO_CACHE_LOCATION (needs the redis package);
+#            recommended whenever more than one worker serves the site
+#   "db"     database table (run `manage.py createcachetable`); shared, but
+#            every cache read and write is a query on the primary
+#   "file"   files under DJANGO_CACHE_LOCATION, shared by workers on one
+#            host, but its increments are not atomic
+# Dashboard generations, page watermarks, cached profiles and rate limits all
+# live in this cache, so with more than one worker it must be shared: under
+# locmem a write handled by one worker is invisible to the others until their
+# entries time out. The ConsultApp.W001 check warns about this.
+# DJANGO_CACHE_MAX_ENTRIES bounds the locmem, db and file backends (Django's
+# own default of 300 is far too small for per-user entries).
+
+CACHE_BACKEND = os.environ.get("DJANGO_CACHE_BACKEND", "locmem").lower()
+CACHE_OPTIONS = {'MAX_ENTRIES': int(os.environ.get("DJANGO_CACHE_MAX_ENTRIES", "50000"))}
+
+if CACHE_BACKEND == "db":
+    CACHES = {
+        'default': {
+            'BACKEND': 'ConsultApp.cache_backends.DatabaseCache',
+            'LOCATION': os.environ.get("DJANGO_CACHE_LOCATION", "researchmate_cache"),
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+elif CACHE_BACKEND == "redis":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get("DJANGO_CACHE_LOCATION", "redis://127.0.0.1:6379/0"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get("DJANGO_CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "researchmate_cache")),
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'researchmate',
+            'OPTIONS': CACHE_OPTIONS,
+        }
+    }
+
+# Seconds a user's dashboard data stays cached (it is also invalidated on writes)
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get("DASHBOARD_CACHE_TIMEOUT", "300"))
+
+# Seconds a user's Student/Consultant/Admin row stays cached (it is also
+# invalidated on writes)
+PROFILE_CACHE_TIMEOUT = int(os.environ.get("PROFILE_CACHE_TIMEOUT", "60"))
+
+# Live appointment status updates (Server-Sent Events). The stream needs an
+# ASGI server; pages only open it when APPOINTMENT_EVENTS_ENABLED is set.
+# On PostgreSQL events are fanned out across workers with LISTEN/NOTIFY.
+APPOINTMENT_EVENTS_ENABLED = os.environ.get("APPOINTMENT_EVENTS_ENABLED", "False").lower() == "true"
+APPOINTMENT_EVENTS_NOTIFY = os.environ.get("APPOINTMENT_EVENTS_NOTIFY", "True").lower() == "true"
+APPOINTMENT_EVENTS_KEEPALIVE = int(os.environ.get("APPOINTMENT_EVENTS_KEEPALIVE", "25"))
+
+# Limits for the login, register and forgot-password forms, checked before
+# any password hashing or email is sent.
+# Each limit is (attempts, window in seconds), keyed by client IP and/or by
+# the email being tried. Counters live in the default cache, which must be
+# db or redis when DEBUG is off (the ConsultApp.W002 check).
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "True").lower() == "true"
+RATE_LIMIT_USE_FORWARDED_FOR = os.environ.get("RATE_LIMIT_USE_FORWARDED_FOR", os.environ.get("RENDER", "False")).lower() == "true"
+RATE_LIMITS = {
+    "login": {"ip": (20, 60), "account": (5, 300)},
+    "register": {"ip": (5, 3600)},
+    "forgot_password": {"ip": (5, 900), "account": (3, 3600)},
+}
+
+# Finished (completed, cancelled, rejected) appointments older than this many
+# days are moved to the archive table by `manage.py archive_appointments`,
+# this many rows per transaction.
+APPOINTMENT_ARCHIVE_AFTER_DAYS = int(os.environ.get("APPOINTMENT_ARCHIVE_AFTER_DAYS", "180"))
+APPOINTMENT_ARCHIVE_BATCH_SIZE = int(os.environ.get("APPOINTMENT_ARCHIVE_BATCH_SIZE", "500"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -124,11 +254,46 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-STATICFILES_DIRS = [] 
-
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
+# Output of `manage.py bundle_static`, collected like any other static dir
+STATIC_BUNDLE_ROOT = BASE_DIR / "build" / "static"
+
+STATICFILES_DIRS = [STATIC_BUNDLE_ROOT] if STATIC_BUNDLE_ROOT.exists() else []
+
+# Content-hashed file names plus pre-compressed gzip/Brotli copies; WhiteNoise
+# serves hashed files with far-future immutable caching.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Stylesheets loaded by each page, in cascade order ({% stylesheet_bundle %})
+STATIC_BUNDLES = {
+    "admin": ["ConsultApp/admin-dashboard.css"],
+    "admin-profile": ["ConsultApp/admin-dashboard.css", "ConsultApp/admin-profile.css"],
+    "appointment": ["ConsultApp/appointment.css"],
+    "consultant-dashboard": ["ConsultApp/consultant-dashboard.css"],
+    "consultant-details": ["ConsultApp/consultant-details.css"],
+    "consultant-pages": ["ConsultApp/student.css", "ConsultApp/consultant.css", "ConsultApp/consultant-dashboard.css"],
+    "consultant-profile": ["ConsultApp/consultant-dashboard.css", "ConsultApp/consultant-profile.css"],
+    "consultant-students": ["ConsultApp/consultant.css", "ConsultApp/consultant-dashboard.css"],
+    "homepage": ["ConsultApp/homepage.css"],
+    "login": ["ConsultApp/login.css"],
+    "password": ["ConsultApp/password.css"],
+    "student-appointments": ["ConsultApp/student.css", "ConsultApp/student-dashboard.css"],
+    "student-dashboard": ["ConsultApp/student-dashboard.css", "ConsultApp/card-grid.css"],
+    "student-history": ["ConsultApp/student.css", "ConsultApp/student-dashboard.css", "ConsultApp/feedback.css"],
+    "student-profile": ["ConsultApp/student-dashboard.css", "ConsultApp/student-profile.css"],
+    "verification": ["ConsultApp/verification.css"],
+}
+
+# Serve the built bundles instead of the individual files (needs bundle_static)
+STATIC_BUNDLES_ENABLED = os.environ.get("STATIC_BUNDLES_ENABLED", str(not DEBUG)).lower() == "true"
 
 if os.environ.get("DJANGO_SECURE_SSL_REDIRECT", "True").lower() == "true":
     SECURE_SSL_REDIRECT = True
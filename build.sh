@@ -6,6 +6,9 @@ pip install -r requirements.txt
 echo "==> Running database migrations"
 python manage.py makemigrations
 python manage.py migrate --noinput
+python manage.py createcachetable
+echo "==> Bundling stylesheets"
+python manage.py bundle_static
 echo "==> Collecting static files"
 python manage.py collectstatic --noinput
 echo "==> Build complete"
\ No newline at end of file